@@ -6,8 +6,21 @@ For usage information see `python -m spin`.
 Read more at https://github.com/scientific-python/spin
 """
 
-__version__ = "0.19rc0.dev0"
+import importlib
 
-from .cmds import util
+__version__ = "0.19rc0.dev0"
 
 __all__ = ["util"]
+
+
+# Submodules are imported on first access, so that lightweight entry
+# points (such as the `spinc` client) do not pay for importing click
+def __getattr__(name):
+    if name == "util":
+        module = importlib.import_module(".cmds.util", __name__)
+    elif name == "cmds":
+        module = importlib.import_module(".cmds", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = module
+    return module
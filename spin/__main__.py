@@ -1,19 +1,22 @@
 import collections
+import functools
 import importlib
 import importlib.util
 import os
 import pathlib
+import shutil
 import sys
 import textwrap
 import traceback
 
 import click
+from click.shell_completion import CompletionItem, get_completion_class
 
-from spin import __version__
+from spin import __version__, cache
 from spin import cmds as _cmds
 from spin.color_format import ColorHelpFormatter
 from spin.containers import DotDict
-from spin.sectioned_help import SectionedHelpGroup
+from spin.sectioned_help import SectionedHelpGroup, describe_params
 
 if sys.version_info >= (3, 11):
     import tomllib
@@ -41,24 +44,291 @@ def _detect_config_dir(path: pathlib.Path) -> pathlib.Path | None:
         return None
 
 
+# Backward compatibility workaround
+# Originally, you could specify any of these commands as `spin.cmd`
+# and we'd fetch it from util
+_compat_commands = {
+    "spin.build": _cmds.meson.build,
+    "spin.test": _cmds.meson.test,
+    "spin.ipython": _cmds.meson.ipython,
+    "spin.python": _cmds.meson.python,
+    "spin.shell": _cmds.meson.shell,
+}
+
+_loaded_commands: dict = {}
+_custom_module_cache: dict = {}
+
+
+def _load_command(cmd, default_kwargs=None):
+    """Import the command specified as `cmd`.
+
+    Returns None if the command cannot be loaded.
+    """
+    if cmd in _compat_commands:
+        return _compat_commands[cmd]
+
+    if cmd in _loaded_commands:
+        return _loaded_commands[cmd]
+
+    # First, see if we can directly import the command
+    if ":" not in cmd:
+        path, func = cmd.rsplit(".", maxsplit=1)
+        try:
+            mod = importlib.import_module(path)
+        except ImportError:
+            print(f"!! Could not import module `{path}` to load command `{cmd}`")
+            return None
+    else:
+        try:
+            path, func = cmd.split(":")
+
+            if path not in _custom_module_cache:
+                spec = importlib.util.spec_from_file_location("custom_mod", path)
+                mod = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(mod)
+                _custom_module_cache[path] = mod
+            else:
+                mod = _custom_module_cache[path]
+
+        except FileNotFoundError:
+            print(f"!! Could not find file `{path}` to load custom command `{cmd}`.\n")
+            return None
+        except Exception as e:
+            print(
+                f"!! Could not import file `{path}` to load custom command `{cmd}`.\n"
+            )
+            raise e
+
+    try:
+        cmd_func = getattr(mod, func)
+        cmd_func.module = mod  # metadata for use by `introspect` command
+    except AttributeError:
+        print(f"!! Could not load command `{func}` from file `{path}`.\n")
+        return None
+
+    # Save command definition for use in `introspect`
+    cmd_func.spec = cmd
+
+    if default_kwargs:
+        callback = cmd_func.callback
+        cmd_func.callback = functools.partial(callback, **default_kwargs)
+
+        # Also override option defaults
+        for option in cmd_func.params:
+            if option.name in default_kwargs:
+                option.default = default_kwargs[option.name]
+
+    _loaded_commands[cmd] = cmd_func
+    return cmd_func
+
+
+def _load_toml(filename):
+    with open(filename, "rb") as f:
+        try:
+            return tomllib.load(f)
+        except tomllib.TOMLDecodeError:
+            print(f"Error: cannot parse [{filename}]", file=sys.stderr)
+
+
+def _load_configs():
+    """Load the configuration files present in the current directory.
+
+    Parsed files are cached, keyed on path, modification time and size,
+    and an unchanged file is loaded from the cache instead of being parsed.
+
+    Returns
+    -------
+    configs : list of dict
+        One entry per existing file in `config_filenames`, or None for
+        files that could not be parsed.
+    """
+    cache_fn = os.path.join(cache.project_cache_dir(), "config.pickle")
+    cached = cache.load(cache_fn, {})
+
+    configs = []
+    entries = {}
+    changed = False
+    for filename in config_filenames:
+        stamp = cache.file_stamp(filename)
+        if stamp is None:
+            continue
+
+        path = os.path.abspath(filename)
+        if (path in cached) and (cached[path][0] == stamp):
+            cfg = cached[path][1]
+        else:
+            cfg = _load_toml(filename)
+            changed = True
+
+        if cfg is not None:
+            entries[path] = (stamp, cfg)
+        configs.append(cfg)
+
+    if changed or (entries.keys() != cached.keys()):
+        cache.store(cache_fn, entries)
+
+    return configs
+
+
+def _manifest_is_current(manifest) -> bool:
+    """Whether the command manifest matches the configuration and sources."""
+    return (
+        isinstance(manifest, dict)
+        and manifest.get("spin_version") == __version__
+        and manifest.get("executable") == sys.executable
+        and "stamps" in manifest
+        and cache.stamps_match(manifest["stamps"])
+    )
+
+
+def _manifest_path():
+    return os.path.join(cache.project_cache_dir(), "commands.pickle")
+
+
+def _add_commands(group, config_cmds, load_command):
+    """Add configured commands to `group`.
+
+    If the command manifest is current, commands are added lazily.
+    Otherwise, they are all loaded, and the manifest is recorded.
+
+    Returns
+    -------
+    manifest : dict or None
+        The current manifest, or None if it could not be recorded.
+    """
+    manifest = cache.load(_manifest_path())
+    if _manifest_is_current(manifest):
+        for section, entries in manifest["sections"]:
+            for entry in entries:
+                group.add_lazy_command(
+                    entry["name"],
+                    functools.partial(load_command, entry["spec"]),
+                    section=section,
+                    short_help=entry["short_help"],
+                    params=entry["params"],
+                )
+    else:
+        sections = []
+        stamps = {filename: cache.file_stamp(filename) for filename in config_filenames}
+        all_loaded = True
+
+        for section, cmds in config_cmds.items():
+            entries = []
+            for cmd in cmds:
+                cmd_func = load_command(cmd)
+                if cmd_func is None:
+                    all_loaded = False
+                    continue
+
+                group.add_command(cmd_func, section=section)
+
+                source = getattr(getattr(cmd_func, "module", None), "__file__", None)
+                if source:
+                    stamps[source] = cache.file_stamp(source)
+                entries.append(
+                    {
+                        "name": cmd_func.name,
+                        "spec": cmd,
+                        "short_help": cmd_func.get_short_help_str() or "",
+                        "params": describe_params(cmd_func),
+                    }
+                )
+            sections.append((section, entries))
+
+        # Commands that failed to load are not recorded, so that the
+        # manifest is rebuilt (and the error shown) until they are fixed
+        if not all_loaded:
+            return None
+
+        manifest = {
+            "spin_version": __version__,
+            "executable": sys.executable,
+            "stamps": stamps,
+            "sections": sections,
+            "help": {},
+        }
+        cache.store(_manifest_path(), manifest)
+
+    return manifest
+
+
+def _program_name():
+    """Name under which spin was invoked, as shown by click."""
+    if getattr(sys.modules["__main__"], "__package__", None) == "spin":
+        return "python -m spin"
+    return os.path.basename(sys.argv[0])
+
+
+def _fast_path(args) -> bool:
+    """Answer version, help and completion requests without building the
+    command group, using the command manifest.
+
+    Returns
+    -------
+    handled : bool
+        Whether the request was answered.  If not, it has to go through
+        the regular command group.
+    """
+    if args == ["--version"]:
+        click.echo(f"{_program_name()} {__version__}")
+        return True
+
+    completion = os.environ.get("_SPIN_COMPLETE")
+    if not (completion or args == ["--help"]):
+        return False
+
+    manifest = cache.load(_manifest_path())
+    if not _manifest_is_current(manifest):
+        return False
+
+    if not completion:
+        help_text = manifest.get("help", {}).get((_program_name(), _help_width()))
+        if help_text is None:
+            return False
+        click.echo(help_text)
+        return True
+
+    # Only command names are served from the manifest; completion of
+    # options and arguments is left to click
+    shell, _, instruction = completion.partition("_")
+    comp_cls = get_completion_class(shell)
+    if (instruction != "complete") or (comp_cls is None):
+        return False
+
+    # Only argument parsing and formatting are used, which need no command
+    comp = comp_cls(None, {}, _program_name(), "_SPIN_COMPLETE")  # type: ignore[arg-type]
+    comp_args, incomplete = comp.get_completion_args()
+    if comp_args or (incomplete and not incomplete[0].isalnum()):
+        return False
+
+    short_help = {
+        entry["name"]: entry["short_help"]
+        for _, entries in manifest["sections"]
+        for entry in entries
+    }
+    items = [
+        CompletionItem(name, help=short_help[name])
+        for name in sorted(short_help)
+        if name.startswith(incomplete)
+    ]
+    click.echo("\n".join(comp.format_completion(item) for item in items))
+    return True
+
+
+def _help_width():
+    return shutil.get_terminal_size()[0]
+
+
 def main():
     # Alias `spin help` to `spin --help`
     if (len(sys.argv) == 2) and (sys.argv[1] == "help"):
         sys.argv[1] = "--help"
 
-    def load_toml(filename):
-        if not os.path.exists(filename):
-            return None
-        with open(filename, "rb") as f:
-            try:
-                return tomllib.load(f)
-            except tomllib.TOMLDecodeError:
-                print(f"Error: cannot parse [{filename}]", file=sys.stderr)
+    if _fast_path(sys.argv[1:]):
+        return
 
     toml_config = collections.ChainMap()
-    toml_config.maps.extend(
-        DotDict(cfg) for filename in config_filenames if (cfg := load_toml(filename))
-    )
+    toml_config.maps.extend(DotDict(cfg) for cfg in _load_configs() if cfg)
 
     if not toml_config:
         click.secho(
@@ -77,26 +347,24 @@ def main():
         sys.exit(1)
 
     # Basic configuration validation
-    version_query = len(sys.argv) == 2 and (sys.argv[1] == "--version")
-
+    # (`--version` is answered before configuration is loaded)
     spin_config = {}
-    if not version_query:
-        if "tool.spin" in toml_config:
-            spin_config = toml_config["tool.spin"]
-            if "tool.spin.commands" not in toml_config:
-                click.secho(
-                    "Error: configuration is missing section [tool.spin.commands]\n"
-                    "See https://github.com/scientific-python/spin/blob/main/README.md\n",
-                    file=sys.stderr,
-                    fg="red",
-                )
-        else:
+    if "tool.spin" in toml_config:
+        spin_config = toml_config["tool.spin"]
+        if "tool.spin.commands" not in toml_config:
             click.secho(
-                "Error: need valid configuration in [.spin.toml], [spin.toml], or [pyproject.toml]\n"
+                "Error: configuration is missing section [tool.spin.commands]\n"
                 "See https://github.com/scientific-python/spin/blob/main/README.md\n",
                 file=sys.stderr,
                 fg="red",
             )
+    else:
+        click.secho(
+            "Error: need valid configuration in [.spin.toml], [spin.toml], or [pyproject.toml]\n"
+            "See https://github.com/scientific-python/spin/blob/main/README.md\n",
+            file=sys.stderr,
+            fg="red",
+        )
 
     proj_name = (
         toml_config.get("project.name")
@@ -118,83 +386,23 @@ def main():
     if isinstance(config_cmds, list):
         config_cmds = {"Commands": config_cmds}
 
-    # Backward compatibility workaround
-    # Originally, you could specify any of these commands as `spin.cmd`
-    # and we'd fetch it from util
-    commands = {
-        "spin.build": _cmds.meson.build,
-        "spin.test": _cmds.meson.test,
-        "spin.ipython": _cmds.meson.ipython,
-        "spin.python": _cmds.meson.python,
-        "spin.shell": _cmds.meson.shell,
-    }
     cmd_default_kwargs = toml_config.get("tool.spin.kwargs", {})
 
-    custom_module_cache = {}
-
-    for section, cmds in config_cmds.items():
-        for cmd in cmds:
-            if cmd not in commands:
-                # First, see if we can directly import the command
-                if ":" not in cmd:
-                    path, func = cmd.rsplit(".", maxsplit=1)
-                    try:
-                        mod = importlib.import_module(path)
-                    except ImportError:
-                        print(
-                            f"!! Could not import module `{path}` to load command `{cmd}`"
-                        )
-                        continue
-                else:
-                    try:
-                        path, func = cmd.split(":")
-
-                        if path not in custom_module_cache:
-                            spec = importlib.util.spec_from_file_location(
-                                "custom_mod", path
-                            )
-                            mod = importlib.util.module_from_spec(spec)
-                            spec.loader.exec_module(mod)
-                            custom_module_cache[path] = mod
-                        else:
-                            mod = custom_module_cache[path]
-
-                    except FileNotFoundError:
-                        print(
-                            f"!! Could not find file `{path}` to load custom command `{cmd}`.\n"
-                        )
-                        continue
-                    except Exception as e:
-                        print(
-                            f"!! Could not import file `{path}` to load custom command `{cmd}`.\n"
-                        )
-                        raise e
-
-                try:
-                    cmd_func = getattr(mod, func)
-                    cmd_func.module = mod  # metadata for use by `introspect` command
-                except AttributeError:
-                    print(f"!! Could not load command `{func}` from file `{path}`.\n")
-                    continue
-
-                # Save command definition for use in `introspect`
-                cmd_func.spec = cmd
-
-                default_kwargs = cmd_default_kwargs.get(cmd)
-                import functools
-
-                if default_kwargs:
-                    callback = cmd_func.callback
-                    cmd_func.callback = functools.partial(callback, **default_kwargs)
-
-                    # Also override option defaults
-                    for option in cmd_func.params:
-                        if option.name in default_kwargs:
-                            option.default = default_kwargs[option.name]
-
-                commands[cmd] = cmd_func
-
-            group.add_command(commands[cmd], section=section)
+    def load_command(cmd):
+        return _load_command(cmd, cmd_default_kwargs.get(cmd))
+
+    # Commands are described in a manifest, so that they only need to be
+    # imported once they are invoked
+    manifest = _add_commands(group, config_cmds, load_command)
+
+    # Record the rendered help, to be served by the fast path next time
+    if (manifest is not None) and (sys.argv[1:] == ["--help"]):
+        ctx = click.Context(group, info_name=_program_name())
+        help_text = group.get_help(ctx)
+        manifest.setdefault("help", {})[(_program_name(), _help_width())] = help_text
+        cache.store(_manifest_path(), manifest)
+        click.echo(help_text)
+        return
 
     try:
         group()
@@ -0,0 +1,96 @@
+"""Persistent caches for state that is expensive to recompute.
+
+Cache entries live under the user cache directory, in a subdirectory per
+project, and are validated against file stamps (modification time and
+size) before use.
+
+Set ``SPIN_CACHE_DIR`` to relocate the cache, or ``SPIN_NO_CACHE=1`` to
+disable it.
+"""
+
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+
+
+def enabled() -> bool:
+    return not os.environ.get("SPIN_NO_CACHE")
+
+
+def user_cache_dir() -> str:
+    """Return the root of the spin cache."""
+    if path := os.environ.get("SPIN_CACHE_DIR"):
+        return path
+
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "spin", "Cache")
+    elif sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Caches/spin")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        return os.path.join(base, "spin")
+
+
+def project_cache_dir(project_dir: str | None = None) -> str:
+    """Return the cache directory of the project in `project_dir`.
+
+    Defaults to the current working directory, which is where spin reads
+    its configuration from.
+    """
+    project_dir = os.path.realpath(project_dir or os.getcwd())
+    digest = hashlib.sha1(project_dir.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(
+        user_cache_dir(), "projects", f"{os.path.basename(project_dir)}-{digest}"
+    )
+
+
+def file_stamp(path: str) -> tuple[int, int] | None:
+    """Return `(mtime_ns, size)` of `path`, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def stamps_match(stamps: dict) -> bool:
+    """Whether all files in `stamps` (a dict of path -> stamp) are unchanged."""
+    return all(file_stamp(path) == stamp for path, stamp in stamps.items())
+
+
+def load(path: str, default=None):
+    """Load a cache entry, or return `default` if it is missing or unreadable."""
+    if not enabled():
+        return default
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        return default
+
+
+def store(path: str, obj) -> None:
+    """Atomically write a cache entry.
+
+    Failure to write (e.g., on a read-only file system) is not an error;
+    the entry is simply recomputed next time.
+    """
+    if not enabled():
+        return
+
+    tmp = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except (OSError, pickle.PicklingError):
+        if tmp is not None:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
@@ -1,16 +1,25 @@
 import contextlib
 import copy
+import hashlib
 import json
+import math
 import os
 import re
+import shlex
 import shutil
 import signal
+import stat
+import subprocess
 import sys
+import threading
+import time
+import uuid
 from enum import Enum
 from pathlib import Path
 
 import click
 
+from .. import cache, durations, impact, ninja_log, procmon, resources
 from .util import get_commands, get_config
 from .util import run as _run
 
@@ -35,15 +44,91 @@ def _meson_cli():
         return [meson_cli]
 
 
+def _json_stamp(path: str) -> list[int] | None:
+    """`cache.file_stamp` of `path`, as recorded in JSON files."""
+    stamp = cache.file_stamp(path)
+    return None if stamp is None else list(stamp)
+
+
+def _replacement_stamp(path: str) -> list[int] | None:
+    """`_json_stamp` of `path`, plus its inode, so that a file replaced by
+    one of the same size and modification time (as by `cp -p` or package
+    managers) is noticed."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size, st.st_ino]
+
+
+def _meson_cli_stamps(meson_cli: list[str]) -> tuple[tuple, dict | None]:
+    """Identify the Meson installation that `meson_cli` runs.
+
+    Returns
+    -------
+    key : tuple
+        `meson_cli`, with the executable (or runner) resolved to a path.
+    stamps : dict or None
+        Modification time, size and inode of the files that determine the
+        Meson version, by path; None if the executable cannot be found.
+    """
+    *interpreter, exe = meson_cli
+    path = exe if exe.endswith(".py") else shutil.which(exe)
+    if not (path and os.path.exists(path)):
+        return tuple(meson_cli), None
+
+    path = os.path.realpath(path)
+    stamps = {path: _replacement_stamp(path)}
+    if interpreter:
+        # A vendored runner keeps its version next to it, and is not
+        # necessarily touched when the vendored Meson is updated
+        coredata = os.path.join(os.path.dirname(path), "mesonbuild", "coredata.py")
+        stamps[coredata] = _replacement_stamp(coredata)
+    return (*interpreter, path), stamps
+
+
+_editable_install_paths: dict = {}
+
+
 def editable_install_path(distname: str) -> str | None:
     """Return path of the editable install for package `distname`.
 
     If the package is not an editable install, return None.
 
+    Looking up package metadata scans all of `sys.path`, so results are
+    memoized, and cached across invocations until one of the `sys.path`
+    entries is modified (as it is when packages are installed or removed).
+
     See Also
     --------
     is_editable_install
     """
+    key = (distname, tuple(sys.path))
+    if key in _editable_install_paths:
+        return _editable_install_paths[key]
+
+    cache_fn = os.path.join(cache.user_cache_dir(), "editable-installs.pickle")
+    # The current directory (on `sys.path` with `python -m spin`) changes
+    # whenever anything is created in the project, so only its path counts
+    cwd = os.getcwd()
+    stamps = {
+        os.path.abspath(p): (
+            cache.file_stamp(p) if (p and os.path.abspath(p) != cwd) else None
+        )
+        for p in sys.path
+    }
+    cached = cache.load(cache_fn, {})
+    cached_stamps, path = cached.get((sys.executable, distname), (None, None))
+    if cached_stamps != stamps:
+        path = _find_editable_install_path(distname)
+        cached[(sys.executable, distname)] = (stamps, path)
+        cache.store(cache_fn, cached)
+
+    _editable_install_paths[key] = path
+    return path
+
+
+def _find_editable_install_path(distname: str) -> str | None:
     import importlib_metadata
 
     try:
@@ -144,8 +229,275 @@ def _get_install_dir(build_dir: str) -> str:
     return f"{build_dir}-install"
 
 
+# Directories are moved here, next to the directory being removed, and
+# deleted in the background
+_TRASH_DIR = ".spin-trash"
+
+_EMPTY_TRASH = """\
+import os, shutil, sys
+trash = sys.argv[1]
+for name in os.listdir(trash):
+    if name != ".gitignore":
+        shutil.rmtree(os.path.join(trash, name), ignore_errors=True)
+try:
+    os.remove(os.path.join(trash, ".gitignore"))
+    os.rmdir(trash)
+except OSError:
+    pass
+"""
+
+
+def _remove_dirs(dirs):
+    """Remove directories, without waiting for their contents to be deleted.
+
+    Each directory is renamed into a trash directory on the same file
+    system, which is emptied by a detached process.  If renaming fails,
+    the directory is deleted right away.
+    """
+    trash_dirs = set()
+    for path in dirs:
+        if not os.path.isdir(path):
+            continue
+        print(f"Removing `{path}`")
+
+        path = os.path.normpath(os.path.abspath(path))
+        trash = os.path.join(os.path.dirname(path), _TRASH_DIR)
+        try:
+            os.makedirs(trash, exist_ok=True)
+            with open(os.path.join(trash, ".gitignore"), "w") as f:
+                f.write("*\n")
+            os.rename(
+                path,
+                os.path.join(trash, f"{os.path.basename(path)}-{uuid.uuid4().hex}"),
+            )
+        except OSError:
+            shutil.rmtree(path)
+            continue
+        trash_dirs.add(trash)
+
+    for trash in trash_dirs:
+        cmd = [sys.executable, "-c", _EMPTY_TRASH, trash]
+        streams: dict = {
+            "stdin": subprocess.DEVNULL,
+            "stdout": subprocess.DEVNULL,
+            "stderr": subprocess.DEVNULL,
+        }
+        try:
+            if sys.platform == "win32":
+                subprocess.Popen(
+                    cmd, creationflags=subprocess.DETACHED_PROCESS, **streams
+                )
+            else:
+                subprocess.Popen(cmd, start_new_session=True, **streams)
+        except OSError:
+            shutil.rmtree(trash, ignore_errors=True)
+
+
+_SIZE_UNITS = {"": 1, "K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40}
+
+
+def _parse_size(size) -> int:
+    """Parse a size such as `500M` or `20G` into bytes."""
+    match = re.fullmatch(
+        r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*", str(size), re.IGNORECASE
+    )
+    if not match:
+        raise click.BadParameter(f"invalid size `{size}`; use, e.g., `500M` or `20G`")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+
+
+def _format_size(size: int) -> str:
+    if size < 1024:
+        return f"{size} B"
+    exponent = min(int(math.log(size, 1024)), 4)
+    return f"{size / 1024**exponent:.1f} {' KMGT'[exponent]}B"
+
+
+def _disk_usage(paths: list[str]) -> int:
+    """Bytes used by the files under `paths`; hard links are counted once."""
+    total = 0
+    seen = set()
+    stack = [p for p in paths if os.path.isdir(p)]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if stat.S_ISDIR(st.st_mode):
+                stack.append(entry.path)
+                continue
+            if st.st_nlink > 1:
+                if (st.st_dev, st.st_ino) in seen:
+                    continue
+                seen.add((st.st_dev, st.st_ino))
+            total += st.st_size
+    return total
+
+
+def _build_dirs_registry() -> str:
+    """Directory with one file per build directory built by spin, holding
+    its path, so that build directories outside the project are found."""
+    return os.path.join(cache.project_cache_dir(), "build-dirs")
+
+
+def _registry_entry(build_dir: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(build_dir).encode("utf-8")).hexdigest()
+    return os.path.join(_build_dirs_registry(), digest[:16])
+
+
+def _touch_build_dir(build_dir: str):
+    """Record that `build_dir` was used, in `spin-info/last-used`."""
+    fn = _spin_info_path(build_dir, "last-used")
+    try:
+        os.utime(fn)
+    except FileNotFoundError:
+        if _is_build_dir(build_dir):
+            with contextlib.suppress(OSError):
+                os.makedirs(os.path.dirname(fn), exist_ok=True)
+                open(fn, "w").close()
+    except OSError:
+        pass
+
+
+def _record_build_dir(build_dir: str):
+    """Record that `build_dir` was built.
+
+    Each build directory is recorded in its own files, so that concurrent
+    builds do not overwrite each other's records.  Sizes are not recorded,
+    since that means walking the build and install directories; `spin gc`
+    measures them when needed.
+    """
+    if not _is_build_dir(build_dir):
+        return
+    _touch_build_dir(build_dir)
+
+    entry = _registry_entry(build_dir)
+    if not os.path.exists(entry):
+        with contextlib.suppress(OSError):
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            with open(entry, "w") as f:
+                f.write(os.path.abspath(build_dir))
+
+
+def _known_build_dirs() -> dict[str, dict]:
+    """Existing build directories, as recorded by spin, and as found in
+    the project directory, with the time they were `last_used` (or last
+    modified, if not recorded).
+    """
+    paths = set()
+    with contextlib.suppress(OSError), os.scandir(_build_dirs_registry()) as entries:
+        for entry in entries:
+            try:
+                with open(entry.path) as f:
+                    path = f.read()
+            except OSError:
+                continue
+            if _is_build_dir(path):
+                paths.add(path)
+            else:
+                with contextlib.suppress(OSError):
+                    os.unlink(entry.path)
+    with os.scandir(".") as entries:
+        for entry in entries:
+            if entry.is_dir() and os.path.isdir(
+                os.path.join(entry.path, "meson-private")
+            ):
+                paths.add(os.path.abspath(entry.path))
+
+    build_dirs = {}
+    for path in paths:
+        stamp = cache.file_stamp(_spin_info_path(path, "last-used"))
+        stamp = stamp or cache.file_stamp(path) or (0, 0)
+        build_dirs[path] = {"last_used": stamp[0] / 1e9}
+    return build_dirs
+
+
+def _collect_garbage(
+    keep: list[str],
+    max_dirs: int | None = None,
+    max_size: int | None = None,
+    dry_run: bool = False,
+) -> list[str]:
+    """Remove the least recently used build directories (and their install
+    directories) beyond `max_dirs` directories or `max_size` bytes.
+
+    Build directories in `keep` are never removed, but count towards the
+    limits.
+
+    Returns
+    -------
+    evicted : list of str
+        Paths of the removed build directories.
+    """
+    build_dirs = _known_build_dirs()
+    keep = [os.path.abspath(d) for d in keep]
+
+    # Sizes are only needed, and measured, if limited
+    if max_size is not None:
+        for path, entry in build_dirs.items():
+            entry["size"] = _disk_usage([path, _get_install_dir(path)])
+
+    order = sorted(
+        build_dirs,
+        key=lambda path: (path in keep, build_dirs[path]["last_used"]),
+        reverse=True,
+    )
+    evicted = []
+    n_kept, kept_size = 0, 0
+    for path in order:
+        size = build_dirs[path].get("size") or 0
+        over_limit = ((max_dirs is not None) and (n_kept >= max_dirs)) or (
+            (max_size is not None) and (kept_size + size > max_size)
+        )
+        if over_limit and path not in keep:
+            evicted.append(path)
+        else:
+            n_kept += 1
+            kept_size += size
+
+    if not dry_run:
+        _remove_dirs(
+            [
+                os.path.relpath(d)
+                for path in evicted
+                for d in (path, _get_install_dir(path))
+            ]
+        )
+        for path in evicted:
+            with contextlib.suppress(OSError):
+                os.unlink(_registry_entry(path))
+    return evicted
+
+
+def _gc_limits() -> tuple[int | None, int | None]:
+    """`max-dirs` and `max-size` (in bytes) from `[tool.spin.gc]`."""
+    cfg = get_config()
+    max_dirs = cfg.get("tool.spin.gc.max-dirs")
+    max_size = cfg.get("tool.spin.gc.max-size")
+    return (
+        None if max_dirs is None else int(max_dirs),
+        None if max_size is None else _parse_size(max_size),
+    )
+
+
+def _auto_collect_garbage(keep: list[str], enabled: bool | None):
+    """Collect build directories after building, if enabled (by default,
+    with `tool.spin.gc.auto`) and limits are configured."""
+    if enabled is None:
+        enabled = get_config().get("tool.spin.gc.auto", False)
+    max_dirs, max_size = _gc_limits()
+    if enabled and ((max_dirs is not None) or (max_size is not None)):
+        _collect_garbage(keep, max_dirs=max_dirs, max_size=max_size)
+
+
 def _get_site_packages(build_dir: str) -> str:
     install_dir = _get_install_dir(build_dir)
+    _touch_build_dir(build_dir)
     try:
         cfg = get_config()
         distname = cfg.get("project.name", None)
@@ -155,11 +507,43 @@ def _get_site_packages(build_dir: str) -> str:
         # Probably not running in click
         pass
 
+    info = _load_spin_info(build_dir, "site-packages.json") or {}
+    if (
+        (info.get("python") == list(sys.version_info[:2]))
+        and (info.get("install_dir") == _json_stamp(install_dir))
+        and os.path.isdir(info.get("path", ""))
+    ):
+        return info["path"]
+
+    return _store_site_packages(build_dir)
+
+
+def _store_site_packages(build_dir: str) -> str:
+    """Find the site-packages directory of the install directory of
+    `build_dir`, and record it, to be looked up by `_get_site_packages`."""
+    install_dir = _get_install_dir(build_dir)
+    site_packages = _find_site_packages(install_dir)
+    if os.path.isdir(build_dir):
+        _store_spin_info(
+            build_dir,
+            "site-packages.json",
+            {
+                "path": site_packages,
+                "python": list(sys.version_info[:2]),
+                "install_dir": _json_stamp(install_dir),
+            },
+        )
+    return site_packages
+
+
+def _find_site_packages(install_dir: str) -> str:
     candidate_paths = []
     for root, dirs, _files in os.walk(install_dir):
         for subdir in dirs:
             if subdir == "site-packages" or subdir == "dist-packages":
                 candidate_paths.append(os.path.abspath(os.path.join(root, subdir)))
+        # Do not descend into installed packages
+        dirs[:] = [d for d in dirs if d not in ("site-packages", "dist-packages")]
 
     X, Y = sys.version_info.major, sys.version_info.minor
 
@@ -190,12 +574,251 @@ def _get_site_packages(build_dir: str) -> str:
     return site_packages
 
 
-def _meson_version() -> str | None:
+def _installed_sources(build_dir: str, install_dir: str) -> dict[str, str]:
+    """Map each installed source file to its location in `install_dir`,
+    according to Meson's `intro-installed.json`.
+
+    Installed directories are expanded into the files they contain.
+    """
     try:
-        p = _run(_meson_cli() + ["--version"], output=False, echo=False)
-        return p.stdout.decode("ascii").strip()
-    except:
+        with open(os.path.join(build_dir, "meson-info", "intro-installed.json")) as f:
+            installed = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    sources = {}
+    for src, dst in installed.items():
+        dst = os.path.abspath(_destdir_path(install_dir, dst))
+        if os.path.isdir(src):
+            for root, dirs, files in os.walk(src):
+                dirs[:] = [d for d in dirs if d != "__pycache__"]
+                for fn in files:
+                    rel = os.path.relpath(os.path.join(root, fn), src)
+                    sources[os.path.join(root, fn)] = os.path.join(dst, rel)
+        else:
+            sources[src] = dst
+    return sources
+
+
+def _native_sources(build_dir: str, includes: bool = False) -> dict[str, set[str]]:
+    """Map the sources of each build target to the files built from them,
+    according to Meson's `intro-targets.json`.
+
+    The sources of a target that is linked into others (e.g., a static
+    library) also map to the files those others build.  With `includes`,
+    files included when compiling (such as headers and Cython `.pxd`
+    files) in the current directory are mapped too, from the dependencies
+    ninja recorded during the last build (`ninja -t deps`).
+    """
+    try:
+        with open(os.path.join(build_dir, "meson-info", "intro-targets.json")) as f:
+            targets = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    dependents: dict[str, set[str]] = {}
+    for target in targets:
+        for dep in target.get("depends", ()):
+            dependents.setdefault(dep, set()).add(target["id"])
+    outputs = {target["id"]: target["filename"] for target in targets}
+
+    sources: dict[str, set[str]] = {}
+    # Built files, keyed on the outputs of each target, relative to `build_dir`
+    built_by: dict[str, set[str]] = {}
+    for target in targets:
+        built: set[str] = set()
+        stack, seen = [target["id"]], set()
+        while stack:
+            t = stack.pop()
+            if t not in seen:
+                seen.add(t)
+                built.update(outputs.get(t, ()))
+                stack += dependents.get(t, ())
+
+        for group in target.get("target_sources", ()):
+            for src in group.get("sources", []) + group.get("generated_sources", []):
+                sources.setdefault(os.path.abspath(src), set()).update(built)
+        for fn in target["filename"]:
+            built_by[os.path.relpath(fn, build_dir)] = built
+
+    ninja = _ninja_cli()
+    if not (includes and ninja):
+        return sources
+    try:
+        p = subprocess.run(
+            [ninja, "-C", build_dir, "-t", "deps"], capture_output=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return sources
+
+    top = os.path.join(os.path.abspath("."), "")
+    built = set()
+    for line in p.stdout.decode(errors="replace").splitlines():
+        if not line.startswith((" ", "\t")):
+            # Objects are compiled in `{target output}.p/`
+            built = built_by.get(line.partition(".p/")[0], set())
+        elif built:
+            path = os.path.abspath(os.path.join(build_dir, line.strip()))
+            if path.startswith(top):
+                sources.setdefault(path, set()).update(built)
+    return sources
+
+
+def _select_changed_tests(
+    rev: str, build_dir: str, site_path: str, tests_dir: str | None
+) -> list[str]:
+    """Tests affected by the changes since `rev`, as paths or node ids.
+
+    The changed files are mapped to installed modules (native sources to
+    the extension modules built from them), and the tests that (directly
+    or not) import those modules are selected, along with tests that
+    executed the changed files in a previous `--coverage` run.  Only
+    tests in `tests_dir`, or installed tests if None, are selected.
+
+    Raises `impact.Uncertain` if the affected tests cannot be determined.
+    """
+    install_dir = os.path.abspath(_get_install_dir(build_dir))
+    sources = _installed_sources(build_dir, install_dir)
+    if not sources:
+        raise impact.Uncertain(f"no Meson install information in `{build_dir}`")
+
+    files = {
+        dst: impact.module_name(os.path.relpath(dst, site_path))
+        for dst in sources.values()
+        if dst.startswith(os.path.join(site_path, ""))
+    }
+    files = {dst: module for dst, module in files.items() if module}
+    test_files = set()
+    if tests_dir:
+        for root, dirs, fns in os.walk(os.path.abspath(tests_dir)):
+            dirs[:] = [d for d in dirs if d != "__pycache__"]
+            test_files |= {os.path.join(root, fn) for fn in fns if fn.endswith(".py")}
+        files |= dict.fromkeys(test_files)
+    else:
+        test_files = set(files)
+
+    graph = _load_spin_info(build_dir, "import-graph.json") or {}
+    graph = impact.update_graph(graph, files)
+    _store_spin_info(build_dir, "import-graph.json", graph)
+
+    changed = set()
+    native = None
+    for path in impact.changed_files(rev):
+        rel = os.path.relpath(path)
+        if impact.is_build_file(path):
+            raise impact.Uncertain(f"`{rel}` may affect any test")
+        elif path in graph:
+            changed.add(path)
+        elif sources.get(path) in graph:
+            changed.add(sources[path])
+        elif impact.is_irrelevant(path):
+            continue
+        else:
+            # Native sources affect the extension modules built from them
+            if native is None:
+                native = _native_sources(build_dir, includes=True)
+            modules = {
+                sources[fn] for fn in native.get(path, ()) if sources.get(fn) in graph
+            }
+            if not modules:
+                raise impact.Uncertain(f"cannot tell which tests `{rel}` affects")
+            changed |= modules
+
+    selected = {
+        path
+        for path in impact.dependents(graph, changed)
+        if (path in test_files) and impact.is_test_file(path)
+    }
+
+    coverage_map = _load_spin_info(build_dir, "coverage-map.json") or {}
+    for path in changed:
+        for nodeid in coverage_map.get(path, ()):
+            if nodeid.partition("::")[0] not in selected:
+                selected.add(nodeid)
+
+    return sorted(selected)
+
+
+def _update_coverage_map(build_dir: str, data_file: str, roots: list[str]):
+    """Record which tests executed which files, from the coverage data of
+    a test run, for use by `spin test --changed`."""
+    try:
+        tests, files = impact.read_coverage(data_file, roots)
+    except impact.Uncertain as e:
+        click.secho(f"Not recording per-test coverage: {e}", fg="yellow")
+        return
+    coverage_map = _load_spin_info(build_dir, "coverage-map.json") or {}
+    coverage_map = impact.update_coverage_map(coverage_map, tests, files)
+    _store_spin_info(build_dir, "coverage-map.json", coverage_map)
+
+
+def _durations_file() -> str | None:
+    """Path of the database of test durations, or None if durations are
+    not recorded."""
+    path = get_config().get("tool.spin.test.durations-file")
+    if path:
+        return os.path.abspath(path)
+    if not cache.enabled():
         return None
+    return os.path.join(cache.project_cache_dir(), "test-durations.sqlite")
+
+
+def _report_durations(path: str | None, n: int = 20):
+    recorded = durations.load(path) if path else {}
+    if not recorded:
+        click.secho("No test durations have been recorded", fg="yellow")
+        return
+
+    files: dict[str, float] = {}
+    for nodeid, duration in recorded.items():
+        fn = nodeid.partition("::")[0]
+        files[fn] = files.get(fn, 0.0) + duration
+
+    click.secho(
+        f"{len(recorded)} tests in {len(files)} files, taking "
+        f"{sum(recorded.values()):.2f}s in total (recorded in `{path}`)",
+        bold=True,
+    )
+    for title, entries in (("files", files), ("tests", recorded)):
+        click.secho(f"\nSlowest {title}:", bold=True)
+        for name, duration in sorted(
+            entries.items(), key=lambda item: item[1], reverse=True
+        )[:n]:
+            click.echo(f"  {duration:9.2f}s  {name}")
+
+
+_meson_versions: dict = {}
+
+
+def _meson_version() -> str | None:
+    """Version of the Meson in use.
+
+    `meson --version` is slow to run (especially for a vendored `.py`
+    runner), so the version is cached across invocations, and only
+    queried again when the Meson executable changes.
+    """
+    meson_cli = _meson_cli()
+    key, stamps = _meson_cli_stamps(meson_cli)
+    if key in _meson_versions:
+        return _meson_versions[key]
+
+    cache_fn = os.path.join(cache.user_cache_dir(), "meson-versions.pickle")
+    versions = cache.load(cache_fn, {})
+    if (stamps is not None) and (key in versions) and (versions[key][0] == stamps):
+        version = versions[key][1]
+    else:
+        try:
+            p = _run(meson_cli + ["--version"], output=False, echo=False)
+            version = p.stdout.decode("ascii").strip()
+        except:
+            return None
+
+        if stamps is not None:
+            versions[key] = (stamps, version)
+            cache.store(cache_fn, versions)
+
+    _meson_versions[key] = version
+    return version
 
 
 def _meson_version_configured(build_dir: str) -> str | None:
@@ -256,6 +879,686 @@ def _check_coverage_tool_installation(coverage_type: GcovReportFormat, build_dir
         )
 
 
+# Environment variables that affect the outcome of a build
+_BUILD_ENV_VARS = (
+    "CC",
+    "CXX",
+    "FC",
+    "OBJC",
+    "OBJCXX",
+    "CPPFLAGS",
+    "CFLAGS",
+    "CXXFLAGS",
+    "FFLAGS",
+    "LDFLAGS",
+    "PKG_CONFIG_PATH",
+    "CC_LD",
+    "CXX_LD",
+)
+
+
+def _spin_info_path(build_dir: str, name: str) -> str:
+    """Path of a file in which spin records information about `build_dir`."""
+    return os.path.join(build_dir, "spin-info", name)
+
+
+def _load_spin_info(build_dir: str, name: str) -> dict | None:
+    try:
+        with open(_spin_info_path(build_dir, name)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _store_spin_info(build_dir: str, name: str, info: dict):
+    fn = _spin_info_path(build_dir, name)
+    try:
+        os.makedirs(os.path.dirname(fn), exist_ok=True)
+        with open(fn, "w") as f:
+            json.dump(info, f)
+    except OSError:
+        pass
+
+
+def _setup_options(args: list[str]) -> dict:
+    """Meson options set by the `meson setup` arguments `args`.
+
+    `-Dname=value`, `-D name=value`, `--name=value`, and `--name value`
+    all set option `name`; later arguments override earlier ones.
+    """
+    options = {}
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg == "-D" and args:
+            arg = "-D" + args.pop(0)
+        if arg.startswith("-D"):
+            name, _, value = arg[2:].partition("=")
+        elif arg.startswith("--"):
+            name, sep, value = arg[2:].partition("=")
+            if not sep:
+                value = args.pop(0) if (args and not args[0].startswith("-")) else ""
+        else:
+            name, value = arg, ""
+        options[name.replace("-", "_")] = value
+    return options
+
+
+def _setup_changes(last_setup: dict, options: dict, env: dict) -> str | None:
+    """How to bring a build directory, configured as recorded in
+    `last_setup`, up to date with setup `options` and environment `env`.
+
+    Returns
+    -------
+    action : {None, "reconfigure", "wipe"}
+        `"reconfigure"` if setup options were added or changed since
+        the build directory was last configured, and `"wipe"` if the environment
+        changed (Meson only reads compilers and flags from the environment
+        when a build directory is first configured).  Options that are no
+        longer given keep their value, as they do in Meson.
+    """
+    if not last_setup:
+        return None
+    if last_setup.get("env") != env:
+        return "wipe"
+    last_options = last_setup.get("options", {})
+    if any(last_options.get(name) != value for name, value in options.items()):
+        return "reconfigure"
+    return None
+
+
+def _is_build_dir(path: str) -> bool:
+    """Whether `path` is a Meson build directory, or its install directory."""
+    if path.endswith("-install"):
+        path = path.removesuffix("-install")
+    return os.path.isdir(os.path.join(path, "meson-private"))
+
+
+def _source_tree_digest(build_dirs: list[str]) -> str:
+    """Digest identifying the contents of the source tree.
+
+    In a git repository, this covers the index (`git ls-files -s`), and
+    the paths, sizes, and modification times of modified, deleted, and
+    untracked files that are not ignored.  Elsewhere, all files are
+    stamped, skipping those ignored by `.gitignore` files, hidden
+    directories, `__pycache__`, and build and install directories
+    (`build_dirs`, and any other directory configured by Meson).
+    """
+    skip = tuple(os.path.join(os.path.relpath(d), "") for d in build_dirs)
+    digest = hashlib.sha1()
+
+    try:
+        index = subprocess.run(
+            ["git", "ls-files", "-s", "-z"], capture_output=True, check=True
+        ).stdout
+        dirty = subprocess.run(
+            ["git", "ls-files", "-m", "-d", "-o", "--exclude-standard", "-z"],
+            capture_output=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        from ..watch import snapshot
+
+        stamps = snapshot(".", ignore=build_dirs, ignore_dir=_is_build_dir)
+        for path, (mtime, size) in sorted(stamps.items()):
+            digest.update(f"{path}\0{mtime}\0{size}\n".encode())
+        return digest.hexdigest()
+
+    digest.update(index)
+    for path in sorted(set(os.fsdecode(dirty).split("\0")) - {""}):
+        if path.startswith(skip):
+            continue
+        stamp = cache.file_stamp(path)
+        digest.update(f"{path}\0{stamp}\n".encode())
+    return digest.hexdigest()
+
+
+def _build_outputs_stamp(build_dir: str, install_dir: str) -> dict:
+    """Stamps of the build files that change when the build is touched
+    outside of spin (reconfigured, cleaned, or the install removed)."""
+    return {
+        path: _json_stamp(path)
+        for path in (
+            os.path.join(build_dir, "build.ninja"),
+            os.path.join(build_dir, "meson-info", "meson-info.json"),
+            install_dir,
+        )
+    }
+
+
+def _ninja_cli() -> str | None:
+    """Path of the ninja executable Meson uses, or None if not found."""
+    ninja = os.environ.get("NINJA") or shutil.which("ninja")
+    return ninja if (ninja and os.path.exists(ninja)) else None
+
+
+# Install plan categories that are plain copies, and can therefore be
+# installed by spin
+_DIRECT_INSTALL_CATEGORIES = (
+    "targets",
+    "python",
+    "headers",
+    "data",
+    "man",
+    "install_subdirs",
+)
+
+
+def _direct_install_plan(build_dir: str) -> list[tuple[str, str, dict]] | None:
+    """Files to install, from Meson's introspection data.
+
+    Returns
+    -------
+    plan : list of (source, destination, details)
+        `destination` is absolute, i.e. includes the prefix.  `details` is
+        the entry in Meson's install plan.  If the introspection data is
+        missing or out of date, or if the installation involves more than
+        copying files (stripping, RPATH changes, symlinks, ...), None is
+        returned, and `meson install` should be used instead.
+
+    Unlike `meson install`, spin does not byte-compile Python files;
+    the interpreter does so when they are first imported.
+    """
+    info_dir = os.path.join(build_dir, "meson-info")
+    try:
+        # Introspection data is rewritten after `build.ninja` on reconfigure
+        ninja_mtime = os.stat(os.path.join(build_dir, "build.ninja")).st_mtime_ns
+        with open(os.path.join(info_dir, "intro-installed.json")) as f:
+            if os.fstat(f.fileno()).st_mtime_ns < ninja_mtime:
+                return None
+            installed = json.load(f)
+        with open(os.path.join(info_dir, "intro-install_plan.json")) as f:
+            install_plan = json.load(f)
+        with open(os.path.join(info_dir, "intro-buildoptions.json")) as f:
+            build_options = {opt["name"]: opt["value"] for opt in json.load(f)}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+    if build_options.get("strip"):
+        return None
+
+    plan = []
+    for category, entries in install_plan.items():
+        if category not in _DIRECT_INSTALL_CATEGORIES:
+            return None
+        for src, details in entries.items():
+            if (src not in installed) or details.get("install_rpath"):
+                return None
+            if details.get("build_rpaths"):
+                return None
+            plan.append((src, installed[src], details))
+    return plan
+
+
+def _destdir_path(destdir: str, path: str) -> str:
+    """Location of install destination `path` under `destdir`."""
+    return os.path.join(destdir, os.path.splitdrive(path)[1].lstrip("/\\"))
+
+
+class InstallMode(str, Enum):
+    copy = "copy"
+    hardlink = "hardlink"
+    symlink = "symlink"
+
+
+def _is_installed(src: str, dst: str, mode: InstallMode) -> bool:
+    """Whether `dst` is an up-to-date install of `src`."""
+    try:
+        dst_st = os.lstat(dst)
+    except FileNotFoundError:
+        return False
+
+    if stat.S_ISLNK(dst_st.st_mode):
+        return (mode == InstallMode.symlink) and (os.readlink(dst) == src)
+
+    st = os.stat(src)
+    if (mode == InstallMode.hardlink) and os.path.samestat(st, dst_st):
+        return True
+
+    # A copy; for links, the fallback when linking is not possible
+    return (dst_st.st_size == st.st_size) and (dst_st.st_mtime_ns >= st.st_mtime_ns)
+
+
+def _install_file(
+    src: str, dst: str, mode: InstallMode = InstallMode.copy, verbose: bool = False
+):
+    """Install `src` as `dst`, unless `dst` is already up to date.
+
+    Links fall back to copies when they cannot be made, e.g. across file
+    systems, or on Windows without the privilege to create symlinks.
+    """
+    if _is_installed(src, dst, mode):
+        return
+
+    if verbose:
+        print(f"Installing {src} to {os.path.dirname(dst)}")
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+
+    # Replace, rather than overwrite, so that processes that have the
+    # file open (e.g., a loaded extension module) keep the old version,
+    # and so that the source of a hardlink is never written to
+    tmp = f"{dst}.spin-tmp"
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(tmp)
+    try:
+        if mode == InstallMode.symlink:
+            os.symlink(src, tmp)
+        elif mode == InstallMode.hardlink:
+            os.link(src, tmp)
+        else:
+            shutil.copy2(src, tmp)
+    except OSError:
+        if mode == InstallMode.copy:
+            raise
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+def _uninstall_files(install_dir: str, files: list[str]):
+    """Remove `files` (relative to `install_dir`), and directories left empty."""
+    for fn in files:
+        path = os.path.join(install_dir, fn)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+        parent = os.path.dirname(path)
+        while os.path.relpath(parent, install_dir) != ".":
+            try:
+                os.rmdir(parent)
+            except OSError:
+                break
+            parent = os.path.dirname(parent)
+
+
+def _uninstall_directly_installed(build_dir: str, install_dir: str):
+    """Remove the files spin installed, so that `meson install` can take over."""
+    manifest = _load_spin_info(build_dir, "installed.json")
+    if manifest:
+        _uninstall_files(install_dir, manifest.get("files", []))
+        _store_spin_info(build_dir, "installed.json", {})
+
+
+def _install_directly(
+    build_dir: str,
+    install_dir: str,
+    mode: InstallMode = InstallMode.copy,
+    verbose: bool = False,
+) -> bool:
+    """Install from Meson's introspection data, updating only outdated files.
+
+    Installed files are recorded in a manifest, so that files no longer
+    installed (e.g., removed from the sources) are removed next time.
+
+    Returns
+    -------
+    installed : bool
+        False if the installation has to be left to `meson install`.
+    """
+    plan = _direct_install_plan(build_dir)
+    if plan is None:
+        return False
+
+    manifest = _load_spin_info(build_dir, "installed.json") or {}
+    if manifest.get("mode") != mode:
+        # Reinstall everything, so that all files use the new mode
+        _uninstall_files(install_dir, manifest.get("files", []))
+        manifest = {}
+
+    installed = []
+
+    def install(src, dst):
+        _install_file(src, dst, mode=mode, verbose=verbose)
+        installed.append(os.path.relpath(dst, install_dir))
+
+    for src, dest, details in plan:
+        dst = _destdir_path(install_dir, dest)
+        if not os.path.isdir(src):
+            install(src, dst)
+            continue
+
+        # `install_subdir`: copy the tree, minus excluded directories and files
+        exclude_dirs = set(details.get("exclude_dirs", []))
+        exclude_files = set(details.get("exclude_files", []))
+        for root, dirs, files in os.walk(src):
+            rel_root = os.path.relpath(root, src)
+            dirs[:] = [
+                d
+                for d in dirs
+                if os.path.normpath(os.path.join(rel_root, d)) not in exclude_dirs
+            ]
+            for fn in files:
+                rel_fn = os.path.normpath(os.path.join(rel_root, fn))
+                if rel_fn not in exclude_files:
+                    install(os.path.join(root, fn), os.path.join(dst, rel_fn))
+
+    stale = set(manifest.get("files", [])) - set(installed)
+    _uninstall_files(install_dir, sorted(stale))
+    _store_spin_info(
+        build_dir, "installed.json", {"mode": mode.value, "files": installed}
+    )
+
+    return True
+
+
+def _memory_per_job() -> tuple[int, str]:
+    """Memory needed per build job, and where that estimate came from.
+
+    Configured with `tool.spin.meson.memory-per-job`, or else learned from
+    recent builds (see `resources.memory_per_job`).
+    """
+    size = get_config().get("tool.spin.meson.memory-per-job")
+    if size is not None:
+        return _parse_size(size), "tool.spin.meson.memory-per-job"
+    return resources.memory_per_job()
+
+
+def _run_compile(cmd: list[str], output: bool = True) -> int | None:
+    """Run the compile command `cmd` as `_run` does, exiting if it fails.
+
+    Returns the peak memory use, in bytes, of its largest process: that of
+    the command itself or one of the build steps it ran.  That is the
+    maximum resident set size reported by `os.wait4`, so it does not
+    include any other processes that spin ran; it is None where `os.wait4`
+    is not available.
+    """
+    click.secho(f"$ {shlex.join(cmd)}", bold=True, fg="bright_blue")
+    try:
+        p = subprocess.Popen(
+            cmd,
+            stdout=None if output else subprocess.PIPE,
+            stderr=None if output else subprocess.STDOUT,
+        )
+    except FileNotFoundError:
+        click.secho(f"`{cmd[0]}` executable not found. Exiting.", fg="bright_red")
+        raise SystemExit(1) from None
+
+    with p:
+        stdout = p.stdout.read() if p.stdout else b""
+        peak = None
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(p.pid, 0)
+            p.returncode = os.waitstatus_to_exitcode(status)
+            peak = usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+        else:
+            p.wait()
+
+    if p.returncode != 0:
+        # Output was suppressed, but the process failed, so print it anyway
+        print(stdout.decode("utf-8", errors="replace"), end="")
+        raise SystemExit(p.returncode)
+    return peak
+
+
+def _auto_jobs(verbose: bool = False) -> int:
+    """Number of build jobs that the available CPUs and memory sustain.
+
+    Jobs are limited by CPUs as ninja would, and further to the number of
+    jobs that fit into the available memory.  With `verbose`, the
+    reasoning is printed.
+    """
+    n_cpus, cpu_source = resources.cpu_limit()
+    jobs = resources.default_ninja_jobs(n_cpus)
+    reasons = [f"{n_cpus} CPUs ({cpu_source}): {jobs} jobs"]
+
+    if memory := resources.available_memory():
+        available, memory_source = memory
+        per_job, per_job_source = _memory_per_job()
+        memory_jobs = max(1, available // max(1, per_job))
+        reasons.append(
+            f"{_format_size(available)} of memory available ({memory_source}), "
+            f"{_format_size(per_job)} per job ({per_job_source}): {memory_jobs} jobs"
+        )
+        jobs = min(jobs, memory_jobs)
+
+    if verbose:
+        click.secho(f"Running {jobs} build jobs, based on:", bold=True)
+        for reason in reasons:
+            click.echo(f"  {reason}")
+    return jobs
+
+
+_COMPILER_CACHES = ("ccache", "sccache")
+
+
+def _compiler_cache() -> tuple[str, str] | None:
+    """The compiler cache to use, as configured by
+    `tool.spin.meson.compiler-cache` (`auto`, `ccache`, `sccache`, or
+    `none`).
+
+    Returns
+    -------
+    cache : tuple of (name, path) or None
+        None if no compiler cache is to be used, or none is installed.
+    """
+    cfg = get_config()
+    setting = cfg.get("tool.spin.meson.compiler-cache", "auto")
+    if setting in (None, False, "none"):
+        return None
+
+    candidates = _COMPILER_CACHES if setting == "auto" else (setting,)
+    for name in candidates:
+        if path := shutil.which(name):
+            return name, path
+
+    if setting != "auto":
+        click.secho(
+            f"Compiler cache `{setting}` not found; building without it",
+            fg="yellow",
+        )
+    return None
+
+
+def _ccache_configured(path: str) -> set[str] | None:
+    """Names of the ccache settings that are configured (in `ccache.conf`
+    or the environment) rather than left at their defaults, or None if
+    unknown."""
+    try:
+        p = _run([path, "--show-config"], output=False, echo=False)
+    except SystemExit:
+        return None
+    # Lines are: `(origin) name = value`
+    configured = set()
+    for line in p.stdout.decode(errors="replace").splitlines():
+        origin, _, setting = line.partition(") ")
+        if setting and (origin != "(default"):
+            configured.add(setting.split(" = ", 1)[0])
+    return configured
+
+
+def _sccache_configured() -> bool:
+    """Whether sccache has a configuration file, which may set its cache."""
+    if os.environ.get("SCCACHE_CONF"):
+        return True
+    if sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Application Support/Mozilla.sccache")
+    elif sys.platform == "win32":
+        base = os.path.join(
+            os.environ.get("APPDATA", ""), "Mozilla", "sccache", "config"
+        )
+    else:
+        config_home = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser(
+            "~/.config"
+        )
+        base = os.path.join(config_home, "sccache")
+    return os.path.exists(os.path.join(base, "config"))
+
+
+def _compiler_cache_env(name: str, path: str) -> dict[str, str]:
+    """Environment that makes the compiler cache use a per-project cache
+    directory, limited to `tool.spin.meson.compiler-cache-size`.
+
+    The cache is only redirected if the user did not configure one, in the
+    environment or in the configuration file of the cache; an existing,
+    possibly shared, cache is left as it is.  Compilers specified in the
+    environment (`CC`, `CXX`, ...) are wrapped with the cache; otherwise,
+    Meson detects and uses it by itself.
+    """
+    cfg = get_config()
+    cache_dir = os.path.join(cache.project_cache_dir(), "compiler-cache", name)
+    size = str(cfg.get("tool.spin.meson.compiler-cache-size", "5G"))
+
+    env = {}
+    if name == "ccache":
+        configured = _ccache_configured(path)
+        if (configured is not None) and ("cache_dir" not in configured):
+            env["CCACHE_DIR"] = cache_dir
+            if "max_size" not in configured:
+                env["CCACHE_MAXSIZE"] = size
+    elif not (
+        _sccache_configured()
+        or os.environ.get("SCCACHE_DIR")
+        or os.environ.get("SCCACHE_CACHE_SIZE")
+    ):
+        env = {"SCCACHE_DIR": cache_dir, "SCCACHE_CACHE_SIZE": size}
+
+    for var in ("CC", "CXX", "OBJC", "OBJCXX"):
+        compiler = os.environ.get(var, "").split()
+        if compiler and (os.path.basename(compiler[0]) not in _COMPILER_CACHES):
+            env[var] = f"{path} {os.environ[var]}"
+
+    return env
+
+
+def _compiler_cache_stats(name: str, path: str) -> tuple[int, int] | None:
+    """Total number of cache hits and misses, or None if unavailable."""
+    try:
+        if name == "ccache":
+            p = _run([path, "--print-stats"], output=False, echo=False)
+            stats = dict(
+                line.split("\t", 1)
+                for line in p.stdout.decode().splitlines()
+                if "\t" in line
+            )
+            hits = int(stats.get("direct_cache_hit", 0)) + int(
+                stats.get("preprocessed_cache_hit", 0)
+            )
+            return hits, int(stats.get("cache_miss", 0))
+        else:
+            p = _run(
+                [path, "--show-stats", "--stats-format=json"], output=False, echo=False
+            )
+            stats = json.loads(p.stdout)["stats"]
+            return (
+                sum(stats["cache_hits"]["counts"].values()),
+                sum(stats["cache_misses"]["counts"].values()),
+            )
+    except (SystemExit, OSError, ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def _report_compiler_cache_stats(name: str, before, after):
+    if (before is None) or (after is None):
+        return
+    hits, misses = after[0] - before[0], after[1] - before[1]
+    if hits + misses <= 0:
+        return
+    click.secho(
+        f"{name}: {hits} hits, {misses} misses "
+        f"({100 * hits / (hits + misses):.0f}% hit rate)",
+        fg="bright_blue",
+    )
+
+
+def _build_profile(name: str) -> dict:
+    """Build directory, Meson arguments, and environment of a build profile,
+    from `[tool.spin.meson.profiles.<name>]`."""
+    cfg = get_config()
+    profile = cfg.get(f"tool.spin.meson.profiles.{name}")
+    if profile is None:
+        raise click.ClickException(
+            f"Build profile `{name}` not found; "
+            f"define it in `[tool.spin.meson.profiles.{name}]`"
+        )
+    return {
+        "build_dir": profile.get("build-dir", f"build-{name}"),
+        "args": [str(arg) for arg in profile.get("args", [])],
+        "env": {var: str(value) for var, value in profile.get("env", {}).items()},
+    }
+
+
+def _share_jobs(total: int, n: int) -> list[int]:
+    """Partition `total` jobs fairly over `n` builds.
+
+    At most `total` builds run at once (see `_build_concurrently`), so if
+    there are more builds than jobs, each gets one job.
+    """
+    running = max(1, min(n, total))
+    return [
+        max(1, total // running + (i % running < total % running)) for i in range(n)
+    ]
+
+
+def _build_concurrently(builds: list[dict], max_running: int, quiet: bool = False):
+    """Run builds, each given as `{"build_dir", "cmd", "env"}`, concurrently.
+
+    At most `max_running` builds run at once; the others wait, in order,
+    for one to finish.  The output of each build is prefixed with its
+    build directory, and a summary is printed once all builds are done.
+    With `quiet`, only the output of failed builds, and the summary if
+    any build failed, are printed.
+    """
+    colors = ["cyan", "magenta", "green", "yellow", "blue", "red"]
+    width = max(len(b["build_dir"]) for b in builds)
+    lock = threading.Lock()
+
+    def run(i, b):
+        prefix = click.style(f"{b['build_dir']:<{width}} |", fg=colors[i % len(colors)])
+        start = time.monotonic()
+        p = subprocess.Popen(
+            b["cmd"],
+            env={**os.environ, **b["env"]},
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        output = []
+        for line in p.stdout:
+            line = f"{prefix} {line.decode(errors='replace').rstrip()}"
+            if quiet:
+                output.append(line)
+                continue
+            with lock:
+                click.echo(line)
+        b["returncode"] = p.wait()
+        b["elapsed"] = time.monotonic() - start
+        if b["returncode"] != 0 and output:
+            with lock:
+                click.echo("\n".join(output))
+
+    pending = list(enumerate(builds))
+
+    def worker():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                i, b = pending.pop(0)
+            run(i, b)
+
+    threads = [
+        threading.Thread(target=worker, daemon=True)
+        for _ in range(max(1, min(max_running, len(builds))))
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    failed = any(b["returncode"] != 0 for b in builds)
+    if quiet and not failed:
+        return
+
+    click.secho("\nBuild summary:", bold=True)
+    for b in builds:
+        if b["returncode"] == 0:
+            status = click.style("ok", fg="green")
+        else:
+            status = click.style(f"failed (exit code {b['returncode']})", fg="red")
+        click.echo(f"  {b['build_dir']:<{width}}  {b['elapsed']:7.1f}s  {status}")
+
+    if failed:
+        raise SystemExit(1)
+
+
 if sys.platform.startswith("win"):
     DEFAULT_PREFIX = "C:/"
 else:
@@ -271,6 +1574,141 @@ build_option = click.option(
     help="Disable building before executing command",
 )
 
+watch_option = click.option(
+    "--watch",
+    is_flag=True,
+    help="Keep running, and run again whenever source files change",
+)
+
+
+monitor_option = click.option(
+    "--monitor",
+    is_flag=True,
+    help="Record the CPU time and peak memory use of each process run, "
+    "sampled every `tool.spin.monitor.interval` seconds (Linux only)",
+)
+
+
+@contextlib.contextmanager
+def _monitor(enabled: bool, build_dir: str, name: str):
+    """Monitor the processes started in the `with` block, if `enabled`.
+
+    A summary is printed, and details written to
+    `{build_dir}/spin-info/monitor-{name}.json`, also if the block fails.
+    """
+    if not enabled:
+        yield
+        return
+    if not procmon.supported():
+        click.secho("Process monitoring is only supported on Linux", fg="yellow")
+        yield
+        return
+
+    # The block may change directories
+    json_fn = os.path.abspath(_spin_info_path(build_dir, f"monitor-{name}.json"))
+    interval = float(get_config().get("tool.spin.monitor.interval", 0.2))
+    monitor = procmon.Monitor(interval)
+    try:
+        with monitor:
+            yield
+    finally:
+        _report_monitor(monitor, json_fn)
+
+
+def _report_monitor(monitor, json_fn: str, n: int = 10):
+    processes = monitor.processes
+    try:
+        os.makedirs(os.path.dirname(json_fn), exist_ok=True)
+        with open(json_fn, "w") as f:
+            json.dump(
+                {
+                    "interval": monitor.interval,
+                    "duration": monitor.duration,
+                    "overhead": monitor.overhead,
+                    "processes": processes,
+                },
+                f,
+                indent=1,
+            )
+    except OSError as e:
+        click.secho(f"Could not write `{json_fn}`: {e}", fg="yellow")
+
+    # Processes with the same command line (such as repeated tool
+    # invocations) are summarized together
+    commands: dict[tuple, dict] = {}
+    for process in processes:
+        if not process["cmdline"]:
+            continue
+        command = commands.setdefault(
+            tuple(process["cmdline"]), {"count": 0, "cpu_time": 0.0, "peak_rss": 0}
+        )
+        command["count"] += 1
+        command["cpu_time"] += process["cpu_time"]
+        command["peak_rss"] = max(command["peak_rss"], process["peak_rss"])
+
+    click.secho(
+        f"\nLargest of {len(processes)} processes, by peak memory use:", bold=True
+    )
+    width = shutil.get_terminal_size()[0] - 34
+    for cmdline, command in sorted(
+        commands.items(), key=lambda item: item[1]["peak_rss"], reverse=True
+    )[:n]:
+        cmdstr = shlex.join([os.path.basename(cmdline[0]), *cmdline[1:]])
+        if len(cmdstr) > width:
+            cmdstr = cmdstr[: max(0, width - 3)] + "..."
+        click.echo(
+            f"  {_format_size(command['peak_rss']):>10} {command['cpu_time']:9.2f}s "
+            f"{command['count']:>5}x  {cmdstr}"
+        )
+
+    share = 100 * monitor.overhead / monitor.duration if monitor.duration else 0
+    click.echo(
+        f"\nMonitoring used {monitor.overhead:.2f}s of CPU time "
+        f"({share:.1f}% of one CPU); details written to `{json_fn}`"
+    )
+
+
+def _watch(build_dirs):
+    """Run the current command, and run it again whenever sources change.
+
+    Build and install directories, and files ignored by git, are not
+    watched.  The environment and working directory are restored after
+    each run.
+    """
+    from ..watch import Watcher
+
+    ctx = click.get_current_context()
+    params = {**ctx.params, "watch": False}
+    ignore = [d for b in build_dirs for d in (b, _get_install_dir(b))]
+    watcher = Watcher(".", ignore=ignore, ignore_dir=_is_build_dir)
+
+    environ, cwd = dict(os.environ), os.getcwd()
+    try:
+        while True:
+            try:
+                ctx.invoke(ctx.command, **params)
+            except SystemExit:
+                pass
+            except click.ClickException as e:
+                e.show()
+            finally:
+                os.chdir(cwd)
+                os.environ.clear()
+                os.environ.update(environ)
+
+            click.secho(
+                f"\nWatching for changes ({watcher.method}); press Ctrl+C to stop",
+                fg="bright_black",
+            )
+            changed = watcher.wait()
+            shown = ", ".join(changed[:5]) + (", ..." if len(changed) > 5 else "")
+            click.secho(f"\nChanged: {shown}", bold=True, fg="bright_blue")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
 build_dir_option = click.option(
     "-C",
     "--build-dir",
@@ -287,7 +1725,8 @@ build_dir_option = click.option(
     "-j",
     "--jobs",
     metavar="N_JOBS",
-    help="Number of parallel tasks to launch",
+    help="Number of parallel tasks to launch. By default, as many as the "
+    "available CPUs and memory allow (shown with `-v`).",
     type=int,
 )
 @click.option("--clean", is_flag=True, help="Clean build directory before build")
@@ -306,15 +1745,83 @@ build_dir_option = click.option(
     metavar="PREFIX",
     default=DEFAULT_PREFIX,
 )
+@click.option(
+    "--direct/--no-direct",
+    default=None,
+    help="Compile with ninja, and install from Meson's introspection data, "
+    "without going through the Meson CLI. "
+    "Defaults to `tool.spin.meson.direct` in the configuration.",
+)
+@click.option(
+    "--install-mode",
+    type=click.Choice([e.name for e in InstallMode]),
+    default=None,
+    help="How spin installs files into the install directory: as copies, or "
+    "as links to the build outputs and sources (falling back to copies where "
+    "links cannot be made). Links imply `--direct` installation. "
+    "Defaults to `tool.spin.meson.install-mode` in the configuration, or `copy`.",
+)
+@click.option(
+    "--timings",
+    is_flag=True,
+    help="Report the slowest build steps, the critical path, and the "
+    "parallelism achieved, based on ninja's log",
+)
+@click.option(
+    "--timings-trace",
+    metavar="TRACE_FILE",
+    type=click.Path(dir_okay=False),
+    help="Also write the build steps as Chrome trace events to TRACE_FILE, "
+    "for viewing in `chrome://tracing` or https://ui.perfetto.dev (implies `--timings`)",
+)
+@click.option(
+    "--force",
+    is_flag=True,
+    help="Build, even if no sources or settings changed since the last build",
+)
+@click.option(
+    "--gc/--no-gc",
+    "collect_garbage",
+    default=None,
+    help="Remove least recently used build directories after building, as "
+    "configured in `[tool.spin.gc]`. Defaults to `tool.spin.gc.auto`.",
+)
+@watch_option
+@monitor_option
+@click.option(
+    "--profile",
+    "profiles",
+    multiple=True,
+    metavar="NAME",
+    help="Build profile from `[tool.spin.meson.profiles.NAME]` in the "
+    "configuration. Can be repeated, and combined with `-C`.",
+)
 @click.argument("meson_args", nargs=-1)
-@build_dir_option
+@click.option(
+    "-C",
+    "--build-dir",
+    multiple=True,
+    metavar="BUILD_DIR",
+    help="Meson build directory; package is installed into "
+    "'./{build-dir}-install'. Defaults to `$SPIN_BUILD_DIR`, or `build`. "
+    "Repeat to build several directories concurrently.",
+)
 def build(
     *,
     meson_args,
+    profiles=(),
     jobs=None,
     clean=False,
     verbose=False,
     gcov=False,
+    direct=None,
+    install_mode=None,
+    timings=False,
+    timings_trace=None,
+    force=False,
+    collect_garbage=None,
+    watch=False,
+    monitor=False,
     quiet=False,
     build_dir=None,
     prefix=None,
@@ -350,7 +1857,74 @@ def build(
 
     Which can then be used to build (`spin-clang build`), to test (`spin-clang test ...`), etc.
 
+    Several build directories are built concurrently with:
+
+      spin build -C build -C build-debug
+
+    and build profiles from the configuration with:
+
+      spin build --profile clang
+
+    If nothing changed since the last build, Meson is not invoked at all
+    (use `--force` to build regardless).  To rebuild whenever a source
+    file changes:
+
+      spin build --watch
+
+    See the spin README for incremental builds, build timings, the number
+    of build jobs, compiler caching, and build profiles.
+
     """
+    if isinstance(build_dir, str):
+        build_dirs = [build_dir]
+    else:
+        build_dirs = list(build_dir or ())
+    targets = [{"build_dir": d, "args": [], "env": {}} for d in build_dirs]
+    targets += [_build_profile(name) for name in profiles]
+    if not targets:
+        # Not an `envvar` of the option, which click would split on spaces
+        default = os.environ.get("SPIN_BUILD_DIR") or "build"
+        targets = [{"build_dir": default, "args": [], "env": {}}]
+
+    if watch:
+        _watch([target["build_dir"] for target in targets])
+        return
+
+    if len(targets) > 1:
+        if meson_compile_args or meson_install_args:
+            raise click.UsageError(
+                "`meson_compile_args` and `meson_install_args` cannot be "
+                "combined with several build directories"
+            )
+        total_jobs = jobs or _auto_jobs(verbose=verbose)
+        share = _share_jobs(total_jobs, len(targets))
+        builds = []
+        for target, n_jobs in zip(targets, share, strict=True):
+            cmd = [sys.executable, "-m", "spin", "build"]
+            cmd += ["-C", target["build_dir"], "-j", str(n_jobs)]
+            cmd += ["--clean"] * clean + ["-v"] * verbose + ["--gcov"] * gcov
+            cmd += ["--force"] * force + ["--timings"] * timings + ["--no-gc"]
+            cmd += ["--monitor"] * monitor
+            cmd += [f"--prefix={prefix}"]
+            if direct is not None:
+                cmd += ["--direct" if direct else "--no-direct"]
+            if install_mode:
+                cmd += [f"--install-mode={install_mode}"]
+            if timings_trace:
+                root, ext = os.path.splitext(timings_trace)
+                slug = re.sub(r"\W+", "-", target["build_dir"]).strip("-")
+                cmd += [f"--timings-trace={root}-{slug}{ext}"]
+            cmd += ["--"] + list(meson_args) + target["args"]
+            builds.append({**target, "cmd": cmd})
+        _build_concurrently(builds, max_running=total_jobs, quiet=quiet)
+        _auto_collect_garbage([t["build_dir"] for t in targets], collect_garbage)
+        return
+
+    (target,) = targets
+    build_dir = target["build_dir"]
+    meson_args = list(meson_args) + target["args"]
+    os.environ.update(target["env"])
+
     abs_build_dir = os.path.abspath(build_dir)
     install_dir = _get_install_dir(build_dir)
     abs_install_dir = os.path.abspath(install_dir)
@@ -375,68 +1949,320 @@ def build(
     )
 
     if clean:
-        print(f"Removing `{build_dir}`")
-        if os.path.isdir(build_dir):
-            shutil.rmtree(build_dir)
-        print(f"Removing `{install_dir}`")
-        if os.path.isdir(install_dir):
-            shutil.rmtree(install_dir)
-
-    if not (os.path.exists(build_dir) and _meson_version_configured(build_dir)):
-        p = _run(setup_cmd, sys_exit=False, output=not quiet)
-        if p.returncode != 0:
-            raise RuntimeError(
-                "Meson configuration failed; please try `spin build` again with the `--clean` flag."
-            )
-    else:
-        # Build dir has been configured; check if it was configured by
-        # current version of Meson
+        _remove_dirs([build_dir, install_dir])
 
-        if (_meson_version() != _meson_version_configured(build_dir)) or (
-            gcov and not _meson_coverage_configured()
-        ):
-            _run(setup_cmd + ["--reconfigure"], output=not quiet)
+    compile_flags = ["-v"] if verbose else []
 
-        # Any other conditions that warrant a reconfigure?
+    install_cmd = _meson_cli() + [
+        "install",
+        "--no-rebuild",
+        "--only-changed",
+        "-C",
+        build_dir,
+        "--destdir",
+        install_dir
+        if os.path.isabs(install_dir)
+        else os.path.relpath(abs_install_dir, abs_build_dir),
+    ]
+
+    if direct is None:
+        direct = cfg.get("tool.spin.meson.direct", False)
+    install_mode = InstallMode(
+        install_mode or cfg.get("tool.spin.meson.install-mode", "copy")
+    )
 
-    compile_flags = ["-v"] if verbose else []
-    if jobs:
+    # Sources are fingerprinted before building, so that files modified
+    # during the build are picked up next time
+    fingerprint = {
+        "setup": setup_cmd,
+        "compile": list(meson_compile_args),
+        "install": install_cmd + list(meson_install_args),
+        "install_mode": install_mode.value,
+        "python": sys.executable,
+        "meson": _meson_cli_stamps(_meson_cli())[1],
+        "env": {var: os.environ.get(var) for var in _BUILD_ENV_VARS},
+        "sources": _source_tree_digest([build_dir, install_dir]),
+    }
+    last_build = _load_spin_info(build_dir, "build.json")
+    if (
+        not (force or clean)
+        and last_build
+        and (last_build.get("fingerprint") == fingerprint)
+        and (last_build.get("outputs") == _build_outputs_stamp(build_dir, install_dir))
+    ):
+        if not quiet:
+            click.secho(
+                f"No changes since the last build in `{build_dir}`; "
+                "use `--force` to build anyway",
+                fg="yellow",
+            )
+        return
+
+    with _monitor(monitor, build_dir, "build"):
+        compiler_cache = _compiler_cache()
+        if compiler_cache:
+            os.environ.update(_compiler_cache_env(*compiler_cache))
+
+        setup_options = _setup_options([f"--prefix={prefix}"] + meson_args_setup)
+        setup_env = {var: os.environ.get(var) for var in _BUILD_ENV_VARS}
+        last_setup = _load_spin_info(build_dir, "setup.json") or {}
+        if not (os.path.exists(build_dir) and _meson_version_configured(build_dir)):
+            p = _run(setup_cmd, sys_exit=False, output=not quiet)
+            if p.returncode != 0:
+                raise RuntimeError(
+                    "Meson configuration failed; please try `spin build` again with the `--clean` flag."
+                )
+            last_setup = {}
+        else:
+            # Build dir has been configured; check if it was configured by
+            # current version of Meson, with the current arguments and
+            # environment
+            changes = _setup_changes(last_setup, setup_options, setup_env)
+            if changes == "wipe":
+                if not quiet:
+                    click.secho(
+                        f"Build environment changed; reconfiguring `{build_dir}` from scratch",
+                        fg="yellow",
+                    )
+                _run(setup_cmd + ["--wipe"], output=not quiet)
+            elif (
+                changes == "reconfigure"
+                or (_meson_version() != _meson_version_configured(build_dir))
+                or (gcov and not _meson_coverage_configured())
+            ):
+                _run(setup_cmd + ["--reconfigure"], output=not quiet)
+
+        # Meson keeps the value of options that are no longer given
+        setup_options = last_setup.get("options", {}) | setup_options
+        _store_spin_info(
+            build_dir, "setup.json", {"options": setup_options, "env": setup_env}
+        )
+
+        if not jobs:
+            jobs = _auto_jobs(verbose=verbose and not quiet)
         compile_flags += ["-j", str(jobs)]
 
-    p = _run(
-        _meson_cli()
-        + ["compile"]
-        + compile_flags
-        + ["-C", build_dir]
-        + list(meson_compile_args),
-        sys_exit=True,
-        output=not quiet,
-    )
+        ninja_log_position = ninja_log.position(build_dir)
+        if compiler_cache and not quiet:
+            cache_stats = _compiler_cache_stats(*compiler_cache)
 
-    p = _run(
-        _meson_cli()
-        + [
-            "install",
-            "--no-rebuild",
-            "--only-changed",
-            "-C",
-            build_dir,
-            "--destdir",
-            install_dir
-            if os.path.isabs(install_dir)
-            else os.path.relpath(abs_install_dir, abs_build_dir),
-        ]
-        + list(meson_install_args),
-        output=(not quiet) and verbose,
+        ninja = _ninja_cli() if (direct and not meson_compile_args) else None
+        if ninja:
+            compile_cmd = [ninja, "-C", build_dir] + compile_flags
+        else:
+            compile_cmd = (
+                _meson_cli()
+                + ["compile"]
+                + compile_flags
+                + ["-C", build_dir]
+                + list(meson_compile_args)
+            )
+        peak_memory = _run_compile(compile_cmd, output=not quiet)
+
+        if compiler_cache and not quiet:
+            _report_compiler_cache_stats(
+                compiler_cache[0], cache_stats, _compiler_cache_stats(*compiler_cache)
+            )
+
+        steps = ninja_log.read(build_dir, ninja_log_position)
+        if steps:
+            resources.record_peak_memory(peak_memory)
+
+        if timings or timings_trace:
+            ninja_log.report_timings(steps, jobs=jobs, trace_fn=timings_trace)
+
+        install_directly = (direct or install_mode != InstallMode.copy) and not (
+            meson_install_args
+        )
+        if not (
+            install_directly
+            and _install_directly(
+                build_dir, install_dir, mode=install_mode, verbose=verbose and not quiet
+            )
+        ):
+            # Links are replaced by copies, rather than written through
+            _uninstall_directly_installed(build_dir, install_dir)
+            p = _run(
+                install_cmd + list(meson_install_args),
+                output=(not quiet) and verbose,
+            )
+
+    with contextlib.suppress(FileNotFoundError):
+        _store_site_packages(build_dir)
+    _store_spin_info(
+        build_dir,
+        "build.json",
+        {
+            "fingerprint": fingerprint,
+            "outputs": _build_outputs_stamp(build_dir, install_dir),
+        },
     )
+    _record_build_dir(build_dir)
+    _auto_collect_garbage([build_dir], collect_garbage)
 
 
 def _get_configured_command(command_name):
+    ctx = click.get_current_context()
+    group = ctx.find_root().command
+    if isinstance(group, click.Group):
+        # Look up by name, so that only the requested command gets loaded
+        return group.get_command(ctx.find_root(), command_name)
+
     command_groups = get_commands()
     commands = [cmd for section in command_groups for cmd in command_groups[section]]
     return next((cmd for cmd in commands if cmd.name == command_name), None)
 
 
+@click.command()
+@click.option(
+    "--install",
+    "only_install",
+    is_flag=True,
+    help="Only remove the install directory.",
+)
+@click.option(
+    "--coverage",
+    "only_coverage",
+    is_flag=True,
+    help="Only remove Python and C coverage data and reports.",
+)
+@click.option(
+    "--docs",
+    "only_docs",
+    is_flag=True,
+    help="Only remove built documentation.",
+)
+@click.option(
+    "--force",
+    is_flag=True,
+    help="Remove the build directory even if it is not a Meson build directory.",
+)
+@build_dir_option
+def clean(
+    *,
+    only_install=False,
+    only_coverage=False,
+    only_docs=False,
+    force=False,
+    build_dir=None,
+):
+    """🧹 Remove build outputs
+
+    By default, the build and install directories are removed.  The
+    `--install`, `--coverage`, and `--docs` flags (which can be combined)
+    instead remove only the install directory, coverage data, or built
+    documentation.
+
+    Directories are moved aside and deleted in the background, so that
+    the next build can start right away.  A non-empty build directory
+    that Meson did not configure is only removed with `--force`.
+    """
+    install_dir = _get_install_dir(build_dir)
+    if not (only_install or only_coverage or only_docs):
+        if (
+            not force
+            and os.path.isdir(build_dir)
+            and os.listdir(build_dir)
+            and not _is_build_dir(build_dir)
+        ):
+            raise click.UsageError(
+                f"`{build_dir}` is not a Meson build directory; "
+                "to remove it anyway, use `--force`"
+            )
+        _remove_dirs([build_dir, install_dir])
+        return
+
+    dirs = []
+    files = []
+    if only_install:
+        dirs.append(install_dir)
+        files.append(_spin_info_path(build_dir, "installed.json"))
+    if only_coverage:
+        logs_dir = os.path.join(build_dir, "meson-logs")
+        dirs += ["build/coverage", os.path.join(logs_dir, "coveragereport")]
+        files += [".coverage"] + [
+            os.path.join(logs_dir, fn)
+            for fn in ("coverage.info", "coverage.txt", "coverage.xml", "sonarqube.xml")
+        ]
+        for root, _, filenames in os.walk(build_dir):
+            files += [
+                os.path.join(root, fn) for fn in filenames if fn.endswith(".gcda")
+            ]
+    if only_docs:
+        for doc_dir in ("doc", "docs"):
+            if os.path.isdir(doc_dir):
+                dirs += _docs_outputs(doc_dir)
+
+    _remove_dirs(dirs)
+    for fn in files:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(fn)
+
+
+@click.command()
+@click.option(
+    "--max-dirs",
+    type=int,
+    metavar="N",
+    help="Keep at most N build directories. Defaults to `tool.spin.gc.max-dirs`.",
+)
+@click.option(
+    "--max-size",
+    metavar="SIZE",
+    help="Keep build directories using at most SIZE (e.g., `20G`) in total. "
+    "Defaults to `tool.spin.gc.max-size`.",
+)
+@click.option(
+    "-n",
+    "--dry-run",
+    is_flag=True,
+    help="Only show which build directories would be removed.",
+)
+@build_dir_option
+def gc(*, max_dirs=None, max_size=None, dry_run=False, build_dir=None):
+    """🗑  Remove least recently used build directories
+
+    spin records when it last used each build directory.  Build directories
+    beyond the configured number or size are removed, least recently used
+    first; the current build directory (see `-C`) is always kept.
+
+    Without any limits, build directories are listed.  Limits can be
+    configured with:
+
+      [tool.spin.gc]
+      max-dirs = 5
+      max-size = '20G'
+      auto = true  # collect after each `spin build`
+    """
+    config_max_dirs, config_max_size = _gc_limits()
+    if max_dirs is None:
+        max_dirs = config_max_dirs
+    max_size = config_max_size if max_size is None else _parse_size(max_size)
+
+    if (max_dirs is None) and (max_size is None):
+        build_dirs = _known_build_dirs()
+        for path, entry in sorted(
+            build_dirs.items(), key=lambda item: item[1]["last_used"], reverse=True
+        ):
+            size = _disk_usage([path, _get_install_dir(path)])
+            last_used = time.strftime(
+                "%Y-%m-%d %H:%M", time.localtime(entry["last_used"])
+            )
+            click.echo(
+                f"{_format_size(size):>10}  {last_used}  {os.path.relpath(path)}"
+            )
+        return
+
+    evicted = _collect_garbage(
+        [build_dir], max_dirs=max_dirs, max_size=max_size, dry_run=dry_run
+    )
+    if dry_run:
+        for path in evicted:
+            click.echo(f"Would remove `{os.path.relpath(path)}`")
+    elif not evicted:
+        click.echo("No build directories to remove")
+
+
 @click.command()
 @click.argument("pytest_args", nargs=-1)
 @click.option(
@@ -445,7 +2271,8 @@ def _get_configured_command(command_name):
     metavar="N_JOBS",
     default="1",
     help=(
-        "Number of parallel jobs for testing with pytest-xdist. Can be set to `auto` to use all cores."
+        "Number of parallel jobs for testing with pytest-xdist. Can be set to `auto` to use all cores. "
+        "The test files that took longest in previous runs are started first."
     ),
 )
 @click.option(
@@ -465,6 +2292,30 @@ Which tests to run. Can be a module, function, class, or method:
 """
     ),
 )
+@click.option(
+    "--changed",
+    metavar="REV",
+    is_flag=False,
+    flag_value="HEAD",
+    default=None,
+    help=(
+        "Only run the tests affected by changes since REV (by default, "
+        "`HEAD`; give another as `--changed=REV`), including uncommitted changes."
+    ),
+)
+@click.option(
+    "--shard",
+    metavar="I/N",
+    help=(
+        "Split the selected tests into N shards of about equal duration, "
+        "and only run the I-th (from 1 to N)."
+    ),
+)
+@click.option(
+    "--durations-report",
+    is_flag=True,
+    help="Show the slowest tests and test files, from the durations of previous runs.",
+)
 @click.option("--verbose", "-v", is_flag=True, default=False)
 @click.option(
     "-c",
@@ -483,6 +2334,8 @@ Which tests to run. Can be a module, function, class, or method:
     default="html",
     help=f"Format of the gcov report. Can be one of {', '.join(e.value for e in GcovReportFormat)}.",
 )
+@watch_option
+@monitor_option
 @build_option
 @build_dir_option
 @click.pass_context
@@ -493,9 +2346,14 @@ def test(
     n_jobs,
     tests,
     verbose,
+    changed=None,
+    shard=None,
+    durations_report=False,
     coverage=False,
     gcov=None,
     gcov_format=None,
+    watch=False,
+    monitor=False,
     build=None,
     build_dir=None,
 ):
@@ -535,15 +2393,69 @@ def test(
 
       spin test -j auto
 
+    Test durations are recorded, and the slowest test files are started
+    first when running in parallel.  To show the recorded durations:
+
+      spin test --durations-report
+
+    To split the tests, e.g. across CI jobs, into shards of about equal
+    duration (according to the recorded durations), and run the second
+    of four:
+
+      spin test --shard 2/4
+
+    To only run the tests affected by changes since `HEAD` (or since the
+    merge base with another revision, e.g. `--changed=main`):
+
+      spin test --changed
+
+    Tests are selected through the imports between modules and, with
+    `tool.spin.test.coverage-map = true`, after a `--coverage` run,
+    through the files each test executed.  If that is not possible (e.g.,
+    when `meson.build` or a `conftest.py` changed), all tests are run.
+
+    To rebuild and rerun the selected tests whenever a source file
+    changes:
+
+      spin test --watch -t numpy.random
+
+    To record the CPU time and peak memory use of the test processes
+    (written to `{build_dir}/spin-info/monitor-test.json`), use
+    `--monitor`.
+
     For more, see `pytest --help`.
     """  # noqa: E501
+    if watch:
+        _watch([build_dir])
+        return
+
+    if durations_report:
+        _report_durations(_durations_file())
+        return
+
     cfg = get_config()
     distname = cfg.get("project.name", None)
     pytest_args = pytest_args or ()
 
+    if changed and tests:
+        raise click.UsageError("`--changed` cannot be combined with `-t`")
+    if changed and impact.is_unknown_revision(changed):
+        raise click.BadParameter(
+            f"`{changed}` is not a git revision; give one as `--changed=REV`",
+            param_hint="--changed",
+        )
+
+    if shard:
+        i, _, n = shard.partition("/")
+        if not (i.isdigit() and n.isdigit() and (1 <= int(i) <= int(n))):
+            raise click.BadParameter(
+                f"`{shard}` is not of the form I/N, with 1 <= I <= N",
+                param_hint="--shard",
+            )
+
     # User specified tests without -t flag
     # Rewrite arguments as though they specified using -t and proceed
-    if (len(pytest_args) == 1) and (not tests):
+    if (len(pytest_args) == 1) and (not tests) and (not changed):
         tests = pytest_args[0]
         pytest_args = ()
 
@@ -557,13 +2469,14 @@ def test(
 
     # User did not specify what to test, so we test
     # the full package, or the tests directory if that is present
-    if not (pytest_args or tests):
-        if os.path.isdir("./tests"):
-            # tests dir exists, presuming you are not shipping tests
-            # with your package, and prefer to run those instead
-            pytest_args = (os.path.abspath("./tests"),)
-        else:
-            pytest_args = ("--pyargs", package)
+    if os.path.isdir("./tests"):
+        # tests dir exists, presuming you are not shipping tests
+        # with your package, and prefer to run those instead
+        all_tests: tuple = (os.path.abspath("./tests"),)
+    else:
+        all_tests = ("--pyargs", package)
+    if not (pytest_args or tests or changed):
+        pytest_args = all_tests
     elif tests:
         if (os.path.sep in tests) or ("/" in tests):
             pytest_args = pytest_args + (tests,)
@@ -592,21 +2505,40 @@ def test(
 
     site_path = _set_pythonpath(build_dir)
 
-    # Sanity check that library built properly
-    #
-    # We do this because `pytest` swallows exception messages originating from `conftest.py`.
-    # This can sometimes suppress useful information raised by the package on init.
-    if sys.version_info[:2] >= (3, 11):
-        p = _run([sys.executable, "-P", "-c", f"import {package}"], sys_exit=False)
-    else:
-        p = _run(
-            [sys.executable, "-c", f"import sys; del sys.path[0]; import {package}"],
-            sys_exit=False,
-        )
-    if p.returncode != 0:
-        print(f"As a sanity check, we tried to import {package}.")
-        print("Stopping. Please investigate the build error.")
-        sys.exit(1)
+    if changed:
+        if is_editable_install:
+            selected = None
+            reason = "tests of editable installs cannot be selected"
+        else:
+            try:
+                selected = _select_changed_tests(
+                    changed,
+                    build_dir,
+                    site_path,
+                    "./tests" if os.path.isdir("./tests") else None,
+                )
+            except impact.Uncertain as e:
+                selected = None
+                reason = str(e)
+
+        if selected is None:
+            click.secho(f"Running all tests: {reason}", bold=True, fg="bright_yellow")
+            pytest_args = pytest_args + all_tests
+        elif not selected:
+            click.secho(
+                f"No tests are affected by changes since `{changed}`",
+                bold=True,
+                fg="bright_green",
+            )
+            raise SystemExit(0)
+        else:
+            click.secho(
+                f"Running {len(selected)} test files or tests affected by "
+                f"changes since `{changed}`",
+                bold=True,
+                fg="bright_green",
+            )
+            pytest_args = pytest_args + tuple(selected)
 
     if (n_jobs != "1") and ("-n" not in pytest_args):
         pytest_args = ("-n", str(n_jobs)) + pytest_args
@@ -626,11 +2558,25 @@ def test(
             f"--cov-report=html:{coverage_dir}",
             f"--cov={package}",
         ]
+    # Record which tests executed which files, for `--changed`
+    coverage_map = coverage and cfg.get("tool.spin.test.coverage-map", False)
+    if coverage_map:
+        pytest_args = [*pytest_args, "--cov-context=test"]
 
+    # `-P` (Python 3.11 and up) keeps the current directory off `sys.path`,
+    # as the `pytest` script does
     if sys.version_info[:2] >= (3, 11):
         cmd = [sys.executable, "-P", "-m", "pytest"]
     else:
         cmd = ["pytest"]
+    # As a sanity check that the package built properly, the plugin imports
+    # it first: pytest swallows exceptions raised while importing
+    # `conftest.py`, which can hide errors raised by the package on import
+    cmd += ["-p", "spin.pytest_plugin", f"--spin-import={package}"]
+    if durations_fn := _durations_file():
+        cmd += [f"--spin-durations={durations_fn}"]
+    if shard:
+        cmd += [f"--spin-shard={shard}"]
 
     install_dir = _get_install_dir(build_dir)
     if not os.path.exists(install_dir):
@@ -640,9 +2586,22 @@ def test(
     test_path = site_path if not os.path.isdir("./src") else None
 
     cwd = os.getcwd()
-    pytest_p = _run(cmd + list(pytest_args), cwd=test_path)
+    with _monitor(monitor, build_dir, "test"):
+        pytest_p = _run(cmd + list(pytest_args), cwd=test_path)
     os.chdir(cwd)
 
+    if coverage_map:
+        _update_coverage_map(
+            build_dir,
+            os.path.join(test_path or cwd, ".coverage"),
+            [
+                cwd,
+                test_path or cwd,
+                site_path,
+                os.path.join(site_path, *package.split(".")),
+            ],
+        )
+
     if gcov:
         # Verify the tools are present
         click.secho(
@@ -932,6 +2891,19 @@ def run(ctx, *, args, build=None, build_dir=None):
     sys.exit(p.returncode)
 
 
+def _docs_outputs(doc_dir: str) -> list[str]:
+    """Directories generated when building the documentation in `doc_dir`."""
+    outputs = []
+    for prefix in ("", "_"):
+        outputs += [
+            f"./{doc_dir}/{prefix}build/",
+            f"./{doc_dir}/{prefix}source/api/",
+            f"./{doc_dir}/{prefix}source/auto_examples/",
+            f"./{doc_dir}/{prefix}source/jupyterlite_contents/",
+        ]
+    return outputs
+
+
 @click.command()
 @click.argument("sphinx_target", default="html")
 @click.option(
@@ -999,20 +2971,8 @@ def docs(
 
     if clean:
         if clean_dirs is None:
-            clean_dirs = []
-            for prefix in ("", "_"):
-                clean_dirs += [
-                    f"./{doc_dir}/{prefix}build/",
-                    f"./{doc_dir}/{prefix}build/",
-                    f"./{doc_dir}/{prefix}source/api/",
-                    f"./{doc_dir}/{prefix}source/auto_examples/",
-                    f"./{doc_dir}/{prefix}source/jupyterlite_contents/",
-                ]
-
-        for target_dir in clean_dirs:
-            if os.path.isdir(target_dir):
-                print(f"Removing {target_dir!r}")
-                shutil.rmtree(target_dir)
+            clean_dirs = _docs_outputs(doc_dir)
+        _remove_dirs(clean_dirs)
 
     build_cmd = _get_configured_command("build")
 
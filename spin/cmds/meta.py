@@ -1,4 +1,5 @@
 import inspect
+import os
 
 import click
 
@@ -62,3 +63,60 @@ def introspect(*, cmd):
             fg="magenta",
         )
         print("  ", overrides[cmd_func.spec], "\n")
+
+
+@click.command()
+@click.argument(
+    "action", type=click.Choice(["start", "stop", "status"]), default="status"
+)
+@click.option(
+    "--idle-timeout",
+    type=float,
+    default=3 * 60 * 60,
+    metavar="SECONDS",
+    help="Exit after this many seconds without requests (0: never).",
+)
+@click.option(
+    "--foreground",
+    is_flag=True,
+    help="Run the server in this process, instead of in the background.",
+)
+def daemon(*, action, idle_timeout, foreground):
+    """👻 Keep spin loaded in a background server
+
+    The server keeps spin, the project configuration and the configured
+    commands imported, so that they need not be loaded for every
+    invocation.  Use it through `spinc`, which takes the same arguments
+    as `spin`:
+
+      spin daemon start
+      spinc test
+
+    Without a running server, `spinc` behaves exactly like `spin`.
+
+    The server restarts itself when the configuration, command sources
+    or build directory change, and exits after `--idle-timeout` seconds
+    of inactivity.
+    """
+    from spin import daemon as _daemon
+
+    if not _daemon.supported():
+        raise SystemExit("Error: `spin daemon` is not supported on this platform")
+
+    if action == "status":
+        info = _daemon.status()
+        if info is None:
+            click.secho("No spin daemon is running", fg="yellow")
+            raise SystemExit(1)
+        click.echo(
+            f"spin daemon {info['pid']} is serving `{info['project']}` "
+            f"({info['workers']} active request(s))"
+        )
+    elif action == "stop":
+        if not _daemon.stop():
+            click.secho("No spin daemon is running", fg="yellow")
+    elif foreground:
+        _daemon._server_main([os.getcwd(), "--idle-timeout", str(idle_timeout)])
+    else:
+        info = _daemon.start(idle_timeout=idle_timeout)
+        click.echo(f"spin daemon {info['pid']} is serving `{info['project']}`")
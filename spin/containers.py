@@ -1,23 +1,41 @@
 import collections
 
+_MISSING = object()
+
 
 class DotDict(collections.UserDict):
-    def __getitem__(self, key):
-        subitem = self.data
+    """Dictionary that also accepts dotted keys, e.g. ``d["tool.spin.package"]``.
+
+    Dotted keys are looked up by walking the nested dictionaries, which are
+    used as they are, not copied, so that modifying them is always
+    reflected.
+    """
+
+    def _lookup(self, key):
+        # The value at `key`, or `_MISSING`; missing keys are common (e.g.,
+        # in the `ChainMap` of configurations), so no exceptions are raised
+        if not isinstance(key, str):
+            return _MISSING
+        if "." not in key:
+            return self.data.get(key, _MISSING)
+        value = self.data
         for subkey in key.split("."):
             try:
-                subitem = subitem[subkey]
-            except KeyError:
-                raise KeyError(f"`{key}` not found in configuration") from None
-        return subitem
+                value = value.get(subkey, _MISSING)
+            except AttributeError:
+                # Not a dictionary, e.g. `project.name.x`
+                return _MISSING
+            if value is _MISSING:
+                break
+        return value
+
+    def __getitem__(self, key):
+        value = self._lookup(key)
+        if value is _MISSING:
+            raise KeyError(f"`{key}` not found in configuration")
+        return value
 
     # Fix for Python 3.12
     # See https://github.com/python/cpython/issues/105524
     def __contains__(self, key):
-        subitem = self.data
-        for subkey in key.split("."):
-            try:
-                subitem = subitem[subkey]
-            except KeyError:
-                return False
-        return True
+        return self._lookup(key) is not _MISSING
@@ -0,0 +1,514 @@
+"""Persistent spin server, with a thin client that forwards invocations to it.
+
+The server keeps spin, the project configuration, and the configured
+commands imported.  Each request is served by a forked worker that
+receives the client's standard streams (passed over a Unix socket),
+environment, working directory, and arguments, and then runs spin as if
+it had been invoked directly.  The worker's exit code is sent back to
+the client.
+
+There is one server per project and Python interpreter, so that a
+client never runs commands with another environment's tools.  The server
+restarts itself when configuration files, command sources, or the build
+directory change, and exits after a period of inactivity.
+
+The client imports this module, so only the standard library may be
+imported at module level.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import selectors
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import time
+import traceback
+
+from . import cache
+
+IDLE_TIMEOUT = 3 * 60 * 60
+
+_FORWARDED_SIGNALS = ("SIGINT", "SIGTERM", "SIGHUP", "SIGQUIT")
+
+# Seconds a client has to send its request, once connected
+_REQUEST_TIMEOUT = 2
+
+
+def supported() -> bool:
+    """Whether this platform can pass file descriptors to forked workers."""
+    return hasattr(socket, "send_fds") and hasattr(os, "fork")
+
+
+def _server_key() -> str:
+    """Identifies the interpreter and environment, so that clients only
+    connect to servers running the same Python (with the same pytest,
+    meson, ...).
+
+    The executable is resolved, as, e.g., `python` and `python3.12` are
+    the same interpreter; virtual environments share the resolved
+    executable with their base, but not `sys.prefix`.
+    """
+    key = f"{os.path.realpath(sys.executable)}\0{sys.prefix}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:8]
+
+
+def socket_path(project_dir: str | None = None) -> str:
+    return os.path.join(
+        cache.project_cache_dir(project_dir), f"daemon-{_server_key()}.sock"
+    )
+
+
+def _log_path(project_dir: str | None = None) -> str:
+    return os.path.join(
+        cache.project_cache_dir(project_dir), f"daemon-{_server_key()}.log"
+    )
+
+
+def _send_msg(sock, obj, fds=()):
+    payload = json.dumps(obj).encode("utf-8")
+    header = struct.pack("!I", len(payload))
+    if fds:
+        socket.send_fds(sock, [header], list(fds))
+    else:
+        sock.sendall(header)
+    sock.sendall(payload)
+
+
+def _recv_exactly(sock, n: int) -> bytes:
+    data = b""
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed by peer")
+        data += chunk
+    return data
+
+
+def _recv_msg(sock, maxfds: int = 0):
+    fds: list[int] = []
+    if maxfds:
+        header, fds, _, _ = socket.recv_fds(sock, 4, maxfds)
+        if not header:
+            raise ConnectionError("Connection closed by peer")
+        header += _recv_exactly(sock, 4 - len(header))
+    else:
+        header = _recv_exactly(sock, 4)
+    (length,) = struct.unpack("!I", header)
+    return json.loads(_recv_exactly(sock, length)), fds
+
+
+def _connect(project_dir: str | None = None):
+    """Connect to the server of the project, or return None."""
+    if not supported():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path(project_dir))
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def _control(action: str, project_dir: str | None = None):
+    sock = _connect(project_dir)
+    if sock is None:
+        return None
+    with sock:
+        try:
+            _send_msg(sock, {"control": action})
+            reply, _ = _recv_msg(sock)
+        except (OSError, ValueError):
+            return None
+    return reply
+
+
+def status(project_dir: str | None = None) -> dict | None:
+    """Return information about the running server, or None."""
+    return _control("status", project_dir)
+
+
+def stop(project_dir: str | None = None) -> bool:
+    """Ask the running server to exit. Returns whether one was running."""
+    return _control("stop", project_dir) is not None
+
+
+def start(
+    project_dir: str | None = None,
+    idle_timeout: float = IDLE_TIMEOUT,
+    timeout: float = 30,
+) -> dict:
+    """Launch a server for the project in the background.
+
+    Returns
+    -------
+    info : dict
+        Status of the server, once it accepts requests.
+    """
+    project_dir = os.path.realpath(project_dir or os.getcwd())
+    if info := status(project_dir):
+        return info
+
+    os.makedirs(cache.project_cache_dir(project_dir), exist_ok=True)
+    with open(_log_path(project_dir), "ab") as log:
+        subprocess.Popen(
+            _server_command(project_dir, idle_timeout),
+            cwd=project_dir,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True,
+        )
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if info := status(project_dir):
+            return info
+        time.sleep(0.05)
+    raise RuntimeError(
+        f"spin daemon did not start; see `{_log_path(project_dir)}` for details"
+    )
+
+
+def _server_command(project_dir, idle_timeout, fd=None):
+    cmd = [
+        sys.executable,
+        "-c",
+        "import sys; from spin.daemon import _server_main; _server_main(sys.argv[1:])",
+        project_dir,
+        "--idle-timeout",
+        str(idle_timeout),
+    ]
+    if fd is not None:
+        cmd += ["--fd", str(fd)]
+    return cmd
+
+
+def _server_main(args):
+    parser = argparse.ArgumentParser(prog="spin-daemon")
+    parser.add_argument("project_dir")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT)
+    parser.add_argument("--fd", type=int, help="Inherited listening socket")
+    ns = parser.parse_args(args)
+
+    os.chdir(ns.project_dir)
+    if ns.fd is None:
+        listener = _listen(socket_path())
+    else:
+        listener = socket.socket(fileno=ns.fd)
+        listener.set_inheritable(False)
+
+    _Server(listener, ns.project_dir, ns.idle_timeout).serve_forever()
+
+
+def _listen(path):
+    if os.path.exists(path):
+        if (sock := _connect()) is not None:
+            sock.close()
+            raise RuntimeError(f"Another spin daemon is listening on `{path}`")
+        os.unlink(path)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask = os.umask(0o177)
+    try:
+        listener.bind(path)
+    finally:
+        os.umask(umask)
+    listener.listen(16)
+    return listener
+
+
+class _Server:
+    def __init__(self, listener, project_dir, idle_timeout):
+        self.listener = listener
+        self.project_dir = project_dir
+        self.idle_timeout = idle_timeout
+        self.selector = selectors.DefaultSelector()
+        self.wakeup_r, self.wakeup_w = socket.socketpair()
+        self.workers = {}  # pid -> client connection
+        self.stamps = {}
+        self.stopping = False
+        self.last_activity = time.monotonic()
+
+    def warm(self):
+        """Import spin and the configured commands; record what to watch."""
+        import collections
+
+        import importlib_metadata  # noqa: F401
+
+        from spin import __main__ as spin_main
+        from spin.containers import DotDict
+
+        watched = list(spin_main.config_filenames)
+
+        configs = spin_main._load_configs()
+        toml_config = collections.ChainMap(*(DotDict(c) for c in configs if c))
+        commands = toml_config.get("tool.spin.commands", [])
+        if isinstance(commands, dict):
+            commands = [cmd for section in commands.values() for cmd in section]
+        cmd_default_kwargs = toml_config.get("tool.spin.kwargs", {})
+
+        for cmd in commands:
+            try:
+                with contextlib.redirect_stdout(sys.stderr):
+                    cmd_func = spin_main._load_command(cmd, cmd_default_kwargs.get(cmd))
+            except Exception:
+                traceback.print_exc()
+                continue
+            source = getattr(getattr(cmd_func, "module", None), "__file__", None)
+            if source:
+                watched.append(source)
+
+        self.stamps = {path: cache.file_stamp(path) for path in watched}
+        self.watch_build_dir(os.environ.get("SPIN_BUILD_DIR", "build"))
+
+    def watch_build_dir(self, build_dir):
+        build_dir = os.path.join(self.project_dir, build_dir)
+        for path in (
+            os.path.join(build_dir, "meson-info", "meson-info.json"),
+            f"{build_dir}-install",
+        ):
+            if path not in self.stamps:
+                self.stamps[path] = cache.file_stamp(path)
+
+    def serve_forever(self):
+        self.warm()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+
+        # Wake up as soon as a worker exits, to report its exit code
+        for sock in (self.wakeup_r, self.wakeup_w):
+            sock.setblocking(False)
+        signal.set_wakeup_fd(self.wakeup_w.fileno())
+        signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+        self.selector.register(self.wakeup_r, selectors.EVENT_READ)
+
+        print(f"spin daemon {os.getpid()} serving `{self.project_dir}`", flush=True)
+
+        try:
+            while True:
+                accepting = self.listener.fileno() in self.selector.get_map()
+                if accepting and (self.stopping or not cache.stamps_match(self.stamps)):
+                    # Let running workers finish, then stop or restart;
+                    # new requests wait in the listen backlog meanwhile
+                    self.selector.unregister(self.listener)
+                    accepting = False
+
+                if not self.workers:
+                    if self.stopping:
+                        break
+                    if not accepting:
+                        self.restart()
+                    idle = time.monotonic() - self.last_activity
+                    if self.idle_timeout and (idle > self.idle_timeout):
+                        print("Exiting after inactivity", flush=True)
+                        break
+
+                for key, _ in self.selector.select(timeout=0.2):
+                    if key.fileobj is self.listener:
+                        self.accept()
+                    elif key.fileobj is self.wakeup_r:
+                        with contextlib.suppress(OSError):
+                            self.wakeup_r.recv(4096)
+                    else:
+                        self.forward_signals(key)
+
+                self.reap()
+        finally:
+            with contextlib.suppress(OSError):
+                os.unlink(socket_path())
+
+    def restart(self):
+        print("Configuration, commands, or build changed; restarting", flush=True)
+        signal.set_wakeup_fd(-1)
+        self.listener.set_inheritable(True)
+        os.execv(
+            sys.executable,
+            _server_command(
+                self.project_dir, self.idle_timeout, self.listener.fileno()
+            ),
+        )
+
+    def accept(self):
+        conn, _ = self.listener.accept()
+        self.last_activity = time.monotonic()
+        # Requests are received here, in the accept loop, so a client that
+        # does not send one must not hold up others for long
+        conn.settimeout(_REQUEST_TIMEOUT)
+        try:
+            request, fds = _recv_msg(conn, maxfds=3)
+        except (OSError, ValueError):
+            conn.close()
+            return
+        conn.settimeout(None)
+
+        if "control" in request:
+            self.control(conn, request["control"])
+            return
+
+        if len(fds) != 3:
+            for fd in fds:
+                os.close(fd)
+            conn.close()
+            return
+
+        if "SPIN_BUILD_DIR" in request["env"]:
+            self.watch_build_dir(request["env"]["SPIN_BUILD_DIR"])
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            self.run_worker(request, fds)
+
+        for fd in fds:
+            os.close(fd)
+        self.workers[pid] = conn
+        self.selector.register(conn, selectors.EVENT_READ, pid)
+
+    def control(self, conn, action):
+        with conn:
+            if action == "stop":
+                self.stopping = True
+            with contextlib.suppress(OSError):
+                _send_msg(
+                    conn,
+                    {
+                        "pid": os.getpid(),
+                        "project": self.project_dir,
+                        "executable": sys.executable,
+                        "workers": len(self.workers),
+                        "stopping": self.stopping,
+                    },
+                )
+
+    def forward_signals(self, key):
+        """Forward signals received by the client to its worker."""
+        conn, pid = key.fileobj, key.data
+        try:
+            data = conn.recv(64)
+        except OSError:
+            data = b""
+
+        if not data:
+            # The client went away, so hang up on the worker
+            self.selector.unregister(conn)
+            data = bytes([signal.SIGHUP])
+
+        for signum in data:
+            with contextlib.suppress(ProcessLookupError, PermissionError):
+                os.killpg(pid, signum)
+
+    def reap(self):
+        for pid in list(self.workers):
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if done == 0:
+                continue
+
+            code = os.waitstatus_to_exitcode(status)
+            if code < 0:
+                # Killed by signal; report like a shell would
+                code = 128 - code
+
+            conn = self.workers.pop(pid)
+            if conn.fileno() in self.selector.get_map():
+                self.selector.unregister(conn)
+            with contextlib.suppress(OSError):
+                conn.sendall(struct.pack("!i", code))
+            conn.close()
+            self.last_activity = time.monotonic()
+
+    def run_worker(self, request, fds):
+        """Serve `request` in a forked worker. Does not return."""
+        code = 1
+        try:
+            signal.set_wakeup_fd(-1)
+            self.selector.close()
+            self.listener.close()
+            self.wakeup_r.close()
+            self.wakeup_w.close()
+            for conn in self.workers.values():
+                conn.close()
+
+            # Become a process group, so that signals reach subprocesses too
+            os.setpgid(0, 0)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            for name in ("SIGTERM", "SIGHUP", "SIGQUIT", "SIGCHLD"):
+                signal.signal(getattr(signal, name), signal.SIG_DFL)
+
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+                os.close(fd)
+            sys.stdin = open(0, closefd=False)
+            sys.stdout = open(1, "w", encoding="utf-8", closefd=False)
+            sys.stderr = open(2, "w", encoding="utf-8", buffering=1, closefd=False)
+
+            os.chdir(request["cwd"])
+            os.environ.clear()
+            os.environ.update(request["env"])
+            sys.argv = ["spin"] + request["argv"]
+
+            code = _run_main()
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            with contextlib.suppress(Exception):
+                sys.stdout.flush()
+                sys.stderr.flush()
+            os._exit(code)
+
+
+def _run_main() -> int:
+    from spin.__main__ import main
+
+    try:
+        main()
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        elif isinstance(e.code, int):
+            return e.code
+        print(e.code, file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 128 + signal.SIGINT
+    return 0
+
+
+def client(argv=None):
+    """Run spin through the project's server, if one is running.
+
+    This is the `spinc` entry point.  Without a server, spin runs in this
+    process, as it would have with `spin`.
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+
+    sock = _connect()
+    if sock is None:
+        sys.argv = ["spin"] + argv
+        from spin.__main__ import main
+
+        return main()
+
+    request = {"argv": argv, "env": dict(os.environ), "cwd": os.getcwd()}
+    _send_msg(sock, request, fds=(0, 1, 2))
+
+    def forward(signum, frame):
+        with contextlib.suppress(OSError):
+            sock.sendall(bytes([signum]))
+
+    for name in _FORWARDED_SIGNALS:
+        signal.signal(getattr(signal, name), forward)
+
+    try:
+        (code,) = struct.unpack("!i", _recv_exactly(sock, 4))
+    except (OSError, ConnectionError):
+        print("spinc: lost connection to the spin daemon", file=sys.stderr)
+        code = 1
+    sys.exit(code)
@@ -0,0 +1,138 @@
+"""Record how long tests take, to schedule and shard tests by their
+expected duration.
+
+Durations are kept in a SQLite database, keyed on pytest node id, so that
+they can be shared between machines that run the same tests.  The paths of
+installed tests are made relative to `site-packages`, so that they do not
+depend on the build directory.  Each test's recorded duration (setup,
+call and teardown) is a running average over the runs that included it,
+weighing recent runs most.
+"""
+
+import heapq
+import os
+import re
+import sqlite3
+import time
+
+_SCHEMA = """\
+CREATE TABLE IF NOT EXISTS durations (
+    nodeid TEXT PRIMARY KEY,
+    duration REAL NOT NULL,
+    runs INTEGER NOT NULL,
+    updated REAL NOT NULL
+)
+"""
+
+# Weight of the latest run in the running average
+_SMOOTHING = 0.5
+
+
+def test_id(nodeid: str) -> str:
+    """Key of the test `nodeid` in the database."""
+    path, sep, rest = nodeid.partition("::")
+    path = re.split(r"(?:^|/)(?:site|dist)-packages/", path)[-1]
+    return path + sep + rest
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    # Several test runs may record concurrently
+    db = sqlite3.connect(path, timeout=30)
+    db.execute(_SCHEMA)
+    return db
+
+
+def load(path: str) -> dict[str, float]:
+    """Recorded durations, in seconds, keyed on node id.
+
+    A missing or unreadable database has no durations.
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        db = _connect(path)
+        try:
+            return dict(db.execute("SELECT nodeid, duration FROM durations"))
+        finally:
+            db.close()
+    except sqlite3.Error:
+        return {}
+
+
+def record(path: str, durations: dict[str, float]):
+    """Add the durations of a test run to the database in `path`."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    db = _connect(path)
+    try:
+        with db:
+            db.executemany(
+                """\
+                INSERT INTO durations VALUES (?, ?, 1, ?)
+                ON CONFLICT (nodeid) DO UPDATE SET
+                    duration = duration + ? * (excluded.duration - duration),
+                    runs = runs + 1,
+                    updated = excluded.updated
+                """,
+                [
+                    (nodeid, duration, time.time(), _SMOOTHING)
+                    for nodeid, duration in durations.items()
+                ],
+            )
+    finally:
+        db.close()
+
+
+def estimate(nodeids: list[str], durations: dict[str, float]) -> list[float]:
+    """Expected durations of `nodeids`.
+
+    Tests without a recorded duration are expected to take the average
+    time of those with one, or 1 if none has one.
+    """
+    known = [durations[nodeid] for nodeid in nodeids if nodeid in durations]
+    default = (sum(known) / len(known)) if known else 1.0
+    return [durations.get(nodeid, default) for nodeid in nodeids]
+
+
+def schedule(test_ids: list[str], durations: dict[str, float]) -> list[int]:
+    """Order in which to run tests so that the longest start first.
+
+    Tests are grouped by file, so that module- and class-scoped fixtures
+    are set up once per group, and the groups are ordered by their
+    expected duration, longest first.  Within a group, tests keep their
+    order.
+
+    Returns
+    -------
+    order : list of int
+        Indices into `test_ids`, in the order in which to run the tests.
+    """
+    expected = estimate(test_ids, durations)
+    groups: dict[str, list[int]] = {}
+    for i, test_id in enumerate(test_ids):
+        groups.setdefault(test_id.partition("::")[0], []).append(i)
+    ordered = sorted(groups.values(), key=lambda g: -sum(expected[i] for i in g))
+    return [i for group in ordered for i in group]
+
+
+def shard(test_ids: list[str], durations: dict[str, float], n: int) -> list[int]:
+    """Partition tests into `n` shards of about equal expected duration.
+
+    Tests are assigned longest first, each to the shard with the least
+    expected duration so far.  Ties are broken by test id and shard
+    index, so the partition only depends on the tests and durations, not
+    on the order in which tests were collected.  Without durations, the
+    shards have equal numbers of tests.
+
+    Returns
+    -------
+    shards : list of int
+        Shard of each test, from 0 to `n - 1`.
+    """
+    expected = estimate(test_ids, durations)
+    loads = [(0.0, i) for i in range(n)]
+    shards = [0] * len(test_ids)
+    for t in sorted(range(len(test_ids)), key=lambda t: (-expected[t], test_ids[t])):
+        load, i = heapq.heappop(loads)
+        shards[t] = i
+        heapq.heappush(loads, (load + expected[t], i))
+    return shards
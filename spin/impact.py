@@ -0,0 +1,262 @@
+"""Select the tests affected by changes to a source tree.
+
+Changes are mapped to the Python modules they affect through a graph of
+the imports between modules, and, optionally, through a map of which
+files each test executed (from a coverage run with per-test contexts).
+
+The graph is a dict, keyed on file path, of::
+
+    {"stamp": ..., "module": "pkg.mod", "imports": ["pkg.other", ...]}
+
+and is updated incrementally: only files whose stamp changed are parsed
+again.
+"""
+
+import ast
+import os
+import re
+import subprocess
+
+# Paths of changed files that, if not otherwise known, cannot affect tests
+_IRRELEVANT_SUFFIXES = (".md", ".rst", ".pyi")
+_IRRELEVANT_DIRS = ("doc", "docs", ".github")
+
+# Changed files that may affect any test
+_BUILD_FILES = (
+    "meson.build",
+    "meson.options",
+    "meson_options.txt",
+    "pyproject.toml",
+    "conftest.py",
+)
+
+
+class Uncertain(Exception):
+    """Raised if the affected tests cannot be determined."""
+
+
+def changed_files(rev: str) -> list[str]:
+    """Files changed in the working tree since the merge base of `rev`
+    and `HEAD`, including untracked files, as absolute paths.
+
+    Only files in the current directory are considered.
+    """
+
+    def git(*args) -> str:
+        try:
+            p = subprocess.run(
+                ["git", "-c", "core.quotepath=off", *args],
+                capture_output=True,
+                check=True,
+            )
+        except (OSError, subprocess.CalledProcessError) as e:
+            stderr = getattr(e, "stderr", b"").decode(errors="replace").strip()
+            raise Uncertain(f"`git {' '.join(args)}` failed: {stderr or e}") from None
+        return p.stdout.decode()
+
+    base = git("merge-base", rev, "HEAD").strip()
+    paths = git("diff", "--name-only", "--relative", "-z", base).split("\0")
+    paths += git("ls-files", "--others", "--exclude-standard", "-z").split("\0")
+    return sorted({os.path.abspath(p) for p in paths if p})
+
+
+def is_unknown_revision(rev: str) -> bool:
+    """Whether git knows of no commit named `rev`.
+
+    False if git cannot tell, e.g. outside of a repository; `changed_files`
+    then raises `Uncertain`.
+    """
+    try:
+        p = subprocess.run(
+            ["git", "rev-parse", "--verify", "--quiet", f"{rev}^{{commit}}"],
+            capture_output=True,
+        )
+    except OSError:
+        return False
+    # With `--quiet`, an unknown revision exits with 1, other errors with 128
+    return p.returncode == 1
+
+
+def is_build_file(path: str) -> bool:
+    return os.path.basename(path) in _BUILD_FILES
+
+
+def is_irrelevant(path: str) -> bool:
+    """Whether a changed file that is not part of the build can be ignored."""
+    parts = os.path.relpath(path).split(os.sep)
+    return path.endswith(_IRRELEVANT_SUFFIXES) or (parts[0] in _IRRELEVANT_DIRS)
+
+
+def is_test_file(path: str) -> bool:
+    name = os.path.basename(path)
+    return name.endswith(".py") and (
+        name.startswith("test_") or name.endswith("_test.py")
+    )
+
+
+def module_name(relpath: str) -> str | None:
+    """Name of the module in `relpath`, relative to `site-packages`.
+
+    Returns None for files that are not Python modules or extension modules.
+    """
+    parts = relpath.replace(os.sep, "/").split("/")
+    name = parts[-1]
+    if name.endswith(".py"):
+        parts[-1] = name.removesuffix(".py")
+        if parts[-1] == "__init__":
+            parts.pop()
+    elif re.search(r"\.(so|pyd)$", name):
+        parts[-1] = name.split(".")[0]
+    else:
+        return None
+    if not parts or not all(part.isidentifier() for part in parts):
+        return None
+    return ".".join(parts)
+
+
+def _imports(path: str, module: str | None) -> list[str]:
+    """Names of the modules imported by the file `path` (of `module`),
+    including names that may refer to objects rather than modules."""
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    is_package = os.path.basename(path) == "__init__.py"
+    names: set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                package = (module or "").split(".")
+                if not is_package:
+                    package = package[:-1]
+                package = package[: len(package) - (node.level - 1)]
+                base = ".".join(p for p in [*package, base] if p)
+            if base:
+                names.add(base)
+            names.update(
+                f"{base}.{alias.name}" if base else alias.name
+                for alias in node.names
+                if alias.name != "*"
+            )
+    return sorted(names)
+
+
+def update_graph(graph: dict, files: dict[str, str | None]) -> dict:
+    """Update the import `graph` to cover `files`, a dict of path to module
+    name (None for files that are not importable, such as tests outside a
+    package).
+
+    Files that cannot be parsed are recorded without imports.
+    """
+    updated = {}
+    for path, module in files.items():
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        stamp = [st.st_mtime_ns, st.st_size]
+        entry = graph.get(path)
+        if not (entry and entry["stamp"] == stamp and entry["module"] == module):
+            imports = []
+            if path.endswith(".py"):
+                try:
+                    imports = _imports(path, module)
+                except (OSError, SyntaxError, ValueError):
+                    pass
+            entry = {"stamp": stamp, "module": module, "imports": imports}
+        updated[path] = entry
+    return updated
+
+
+def dependents(graph: dict, paths: set[str]) -> set[str]:
+    """Files in `graph` that are in `paths`, or import (directly or not) a
+    module in `paths`."""
+    modules = {
+        entry["module"]: path for path, entry in graph.items() if entry["module"]
+    }
+    importers: dict[str, set[str]] = {}
+    for path, entry in graph.items():
+        for name in entry["imports"]:
+            # Importing `a.b.c` also imports `a` and `a.b`
+            parts = name.split(".")
+            for i in range(1, len(parts) + 1):
+                if (prefix := ".".join(parts[:i])) in modules:
+                    importers.setdefault(modules[prefix], set()).add(path)
+
+    affected = set()
+    stack = [p for p in paths if p in graph]
+    while stack:
+        path = stack.pop()
+        if path in affected:
+            continue
+        affected.add(path)
+        stack += importers.get(path, ())
+    return affected
+
+
+def read_coverage(data_file: str, roots: list[str]) -> tuple[set[str], dict]:
+    """Read which tests executed which files from coverage data recorded
+    with per-test contexts (`pytest --cov-context=test`).
+
+    Test node ids are made absolute, by resolving their paths against
+    the first of `roots` in which they exist.  Raises `Uncertain` if the
+    data cannot be read.
+
+    Returns
+    -------
+    tests : set of str
+        All tests that were run.
+    files : dict
+        Maps each measured file to the list of tests that executed it.
+    """
+    try:
+        import coverage  # type: ignore[import-not-found]
+    except ImportError:
+        raise Uncertain("coverage is not installed") from None
+
+    data = coverage.CoverageData(data_file)
+    try:
+        data.read()
+    except Exception as e:  # `DataError`, located differently across versions
+        raise Uncertain(f"cannot read `{data_file}`: {e}") from None
+
+    resolved: dict[str, str | None] = {}
+
+    def resolve(context: str) -> str | None:
+        if context not in resolved:
+            nodeid = context.rpartition("|")[0] or context
+            path, sep, rest = nodeid.partition("::")
+            resolved[context] = None
+            for root in roots:
+                if path and os.path.isfile(os.path.join(root, path)):
+                    resolved[context] = os.path.abspath(os.path.join(root, path)) + (
+                        sep + rest
+                    )
+                    break
+        return resolved[context]
+
+    tests = set()
+    files = {}
+    for fn in data.measured_files():
+        executed = set()
+        for contexts in (data.contexts_by_lineno(fn) or {}).values():
+            for context in contexts:
+                if context and (test := resolve(context)):
+                    executed.add(test)
+        tests |= executed
+        files[fn] = sorted(executed)
+    return tests, files
+
+
+def update_coverage_map(coverage_map: dict, tests: set[str], files: dict) -> dict:
+    """Merge the result of `read_coverage` into `coverage_map`, replacing
+    what was previously recorded for the tests that were run."""
+    updated = {}
+    for fn in coverage_map.keys() | files.keys():
+        executed = {t for t in coverage_map.get(fn, ()) if t not in tests}
+        executed.update(files.get(fn, ()))
+        if executed:
+            updated[fn] = sorted(executed)
+    return updated
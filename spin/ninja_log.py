@@ -0,0 +1,156 @@
+"""Read the build steps that ninja records in `.ninja_log`, and report
+where build time went.
+
+Each line of the log records the start and end time (in milliseconds
+since the start of the build), the output, and the command hash of a
+build step.  The log does not record dependencies between steps, so the
+critical path is estimated from the timings alone.
+"""
+
+import bisect
+import heapq
+import json
+import os
+
+import click
+
+from . import resources
+
+
+def position(build_dir: str) -> tuple[int, int] | None:
+    """Inode and size of `.ninja_log`, to later read what a build appended."""
+    try:
+        st = os.stat(os.path.join(build_dir, ".ninja_log"))
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size)
+
+
+def read(build_dir: str, position: tuple[int, int] | None = None):
+    """Build steps of the last build recorded in `.ninja_log`.
+
+    Parameters
+    ----------
+    build_dir : str
+        Meson build directory.
+    position : tuple
+        Position in the log before the build, from `position`.
+        If ninja since rewrote the log, the last build is instead
+        identified by its timestamps restarting at zero.
+
+    Returns
+    -------
+    steps : list of (start_ms, end_ms, outputs)
+        Sorted by end time.
+    """
+    log_fn = os.path.join(build_dir, ".ninja_log")
+    try:
+        with open(log_fn, "rb") as f:
+            if not f.readline().startswith(b"# ninja log v"):
+                return []
+            if position and (position[0] == os.fstat(f.fileno()).st_ino):
+                f.seek(max(position[1], f.tell()))
+            lines = f.read().decode("utf-8", errors="replace").splitlines()
+    except OSError:
+        return []
+
+    # Lines are: start, end, mtime, output, command hash.  Commands with
+    # several outputs have a line per output.
+    steps: dict[tuple, list[str]] = {}
+    last_end = 0
+    for line in lines:
+        fields = line.split("\t")
+        if len(fields) < 5:
+            continue
+        try:
+            start, end = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue
+        if end < last_end:
+            # A new build started
+            steps.clear()
+        last_end = end
+        steps.setdefault((start, end, fields[4]), []).append(fields[3])
+
+    return [(start, end, outputs) for (start, end, _), outputs in steps.items()]
+
+
+def critical_path(steps) -> list:
+    """Estimate the critical path of a build from step timings alone.
+
+    `.ninja_log` does not record dependencies, so the path is traced back
+    from the last step to finish, each time to the step that finished
+    last before it started.
+    """
+    steps = sorted(steps, key=lambda step: step[1])
+    ends = [end for _, end, _ in steps]
+    path = []
+    i = len(steps) - 1
+    while i >= 0:
+        path.append(steps[i])
+        i = bisect.bisect_right(ends, steps[i][0], hi=i) - 1
+    return path[::-1]
+
+
+def chrome_trace(steps) -> list[dict]:
+    """Trace events for the build steps, for `chrome://tracing` or Perfetto.
+
+    Steps are distributed over as few threads as possible, so that each
+    thread corresponds to a ninja job slot.
+    """
+    events = []
+    free_slots: list[int] = []
+    busy_slots: list[tuple[int, int]] = []  # (end, slot)
+    for start, end, outputs in sorted(steps):
+        while busy_slots and busy_slots[0][0] <= start:
+            heapq.heappush(free_slots, heapq.heappop(busy_slots)[1])
+        slot = heapq.heappop(free_slots) if free_slots else len(busy_slots)
+        heapq.heappush(busy_slots, (end, slot))
+        events.append(
+            {
+                "name": ", ".join(outputs),
+                "cat": "targets",
+                "ph": "X",
+                "ts": start * 1000,
+                "dur": (end - start) * 1000,
+                "pid": 0,
+                "tid": slot,
+            }
+        )
+    return events
+
+
+def report_timings(steps, jobs: int | None = None, trace_fn=None, n=10):
+    """Print the `n` slowest build steps, the critical path, and the
+    parallelism achieved with `jobs` jobs; with `trace_fn`, also write the
+    steps as trace events to that file."""
+    if not steps:
+        click.secho("No build steps were run; no timings to report", fg="yellow")
+        return
+
+    durations = [end - start for start, end, _ in steps]
+    total = sum(durations)
+    wall = max(end for _, end, _ in steps) - min(start for start, _, _ in steps)
+    critical = critical_path(steps)
+    jobs = jobs or resources.default_ninja_jobs()
+
+    click.secho(f"\nSlowest of {len(steps)} build steps:", bold=True)
+    for start, end, outputs in sorted(steps, key=lambda s: s[0] - s[1])[:n]:
+        share = 100 * (end - start) / total if total else 0
+        click.echo(
+            f"  {(end - start) / 1000:8.2f}s {share:5.1f}%  {', '.join(outputs)}"
+        )
+
+    critical_time = sum(end - start for start, end, _ in critical)
+    click.echo(
+        f"\nWall time: {wall / 1000:.2f}s; "
+        f"total time of all steps: {total / 1000:.2f}s\n"
+        f"Critical path (estimated): {critical_time / 1000:.2f}s "
+        f"over {len(critical)} steps, ending in `{', '.join(critical[-1][2])}`\n"
+        f"Parallelism: {total / wall if wall else 1:.1f} of {jobs} jobs"
+    )
+
+    if trace_fn:
+        with open(trace_fn, "w") as f:
+            json.dump(chrome_trace(steps), f)
+        click.echo(f"Trace written to `{trace_fn}`")
@@ -0,0 +1,151 @@
+"""Monitor the CPU time and peak memory use of child processes.
+
+The processes descending from the current one are sampled through
+`/proc`, so monitoring is only supported on Linux.  The peak resident set
+size is the kernel's high-water mark (`VmHWM`), so it is exact for every
+process seen at least once; processes that exit between two samples are
+not seen.
+"""
+
+import os
+import sys
+import threading
+import time
+
+
+def supported() -> bool:
+    return sys.platform.startswith("linux") and os.path.isdir("/proc/self")
+
+
+def _read(path: str) -> str | None:
+    try:
+        with open(path, "rb") as f:
+            return f.read().decode(errors="replace")
+    except OSError:
+        return None
+
+
+class Monitor:
+    """Sample the processes descending from this one, in a thread.
+
+    Use as a context manager, around the code that starts the processes.
+
+    Parameters
+    ----------
+    interval : float
+        Seconds between samples.
+    """
+
+    def __init__(self, interval: float = 0.2):
+        self.interval = interval
+        self.duration = 0.0
+        # CPU time spent sampling, in seconds
+        self.overhead = 0.0
+
+        # Keyed on (pid, start time), as pids are reused
+        self._processes: dict[tuple[int, int], dict] = {}
+        self._clock_ticks = os.sysconf("SC_CLK_TCK")
+        self._own_cmdline = self._cmdline(os.getpid())
+        self._has_children = os.path.exists(
+            f"/proc/self/task/{threading.get_native_id()}/children"
+        )
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._start = time.monotonic()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.monotonic() - self._start
+
+    @property
+    def processes(self) -> list[dict]:
+        """Processes seen, in order of appearance.
+
+        Each is a dict with `pid`, `cmdline` (list of str), `cpu_time` (user
+        and system, in seconds), `peak_rss` (bytes), and `start` and `end`
+        (seconds since monitoring started, when first and last seen).
+        """
+        return sorted(self._processes.values(), key=lambda p: p["start"])
+
+    def _run(self):
+        while True:
+            cpu_start = time.thread_time()
+            self.sample()
+            self.overhead += time.thread_time() - cpu_start
+            if self._stop.wait(self.interval):
+                break
+
+    def _children(self, pid: int) -> list[int]:
+        children = []
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            content = _read(f"/proc/{pid}/task/{tid}/children") or ""
+            children += [int(child) for child in content.split()]
+        return children
+
+    def _descendants(self) -> list[int]:
+        if self._has_children:
+            descendants = []
+            stack = [os.getpid()]
+            while stack:
+                try:
+                    children = self._children(stack.pop())
+                except OSError:
+                    continue
+                descendants += children
+                stack += children
+            return descendants
+
+        # Without `children` files, build the process tree from all processes
+        children_of: dict[int, list[int]] = {}
+        for entry in os.listdir("/proc"):
+            if entry.isdigit() and (stat := _read(f"/proc/{entry}/stat")):
+                ppid = int(stat.rpartition(")")[2].split()[1])
+                children_of.setdefault(ppid, []).append(int(entry))
+        descendants = []
+        stack = [os.getpid()]
+        while stack:
+            children = children_of.get(stack.pop(), [])
+            descendants += children
+            stack += children
+        return descendants
+
+    @staticmethod
+    def _cmdline(pid: int) -> list[str]:
+        return (_read(f"/proc/{pid}/cmdline") or "").split("\0")[:-1]
+
+    def sample(self):
+        """Record the CPU time and peak memory use of all descendants."""
+        now = time.monotonic() - self._start
+        for pid in self._descendants():
+            stat = _read(f"/proc/{pid}/stat")
+            status = _read(f"/proc/{pid}/status")
+            if not (stat and status):
+                continue
+
+            # Fields following the command name, which may contain spaces
+            fields = stat.rpartition(")")[2].split()
+            utime, stime, start_time = int(fields[11]), int(fields[12]), int(fields[19])
+            peak_rss = 0
+            for line in status.splitlines():
+                if line.startswith("VmHWM:"):
+                    peak_rss = int(line.split()[1]) * 1024
+                    break
+
+            process = self._processes.get((pid, start_time))
+            if process is None:
+                process = self._processes[(pid, start_time)] = {
+                    "pid": pid,
+                    "cmdline": self._own_cmdline,
+                    "start": now,
+                }
+            # Until a forked child calls `exec`, it runs our command line
+            if process["cmdline"] == self._own_cmdline:
+                process["cmdline"] = self._cmdline(pid)
+            process["cpu_time"] = (utime + stime) / self._clock_ticks
+            process["peak_rss"] = max(process.get("peak_rss", 0), peak_rss)
+            process["end"] = now
@@ -0,0 +1,155 @@
+"""pytest plugin used by `spin test`.
+
+`spin test` loads this plugin with `-p spin.pytest_plugin`.  It
+
+- imports the package under test before anything else
+  (`--spin-import=PKG`).  pytest swallows exception messages raised while
+  importing `conftest.py` files, which hides useful information raised by
+  packages on import (such as a broken build); importing the package
+  first shows the full error.
+- records test durations (`--spin-durations=DB`), see `spin.durations`.
+  When tests are distributed with pytest-xdist, the longest test files
+  are started first, so that no slow test is left to run on its own at
+  the end; the tests of each file are kept together, in order.
+- runs one of several shards of the tests (`--spin-shard=I/N`), balanced
+  by the recorded durations.  Sharded runs do not record durations: the
+  other shards, if run later against the same database, would otherwise
+  partition the tests differently, and run some twice and others not at
+  all.
+"""
+
+import sqlite3
+import traceback
+
+import pytest
+
+from spin import durations
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--spin-import",
+        metavar="PACKAGE",
+        help="Import PACKAGE before loading conftest files, and stop if that fails.",
+    )
+    parser.addoption(
+        "--spin-durations",
+        metavar="DB",
+        help="Record test durations in DB, and run the longest tests first "
+        "when distributing tests with pytest-xdist.",
+    )
+    parser.addoption(
+        "--spin-shard",
+        metavar="I/N",
+        help="Only run the I-th of N shards of the selected tests (from 1 to N).",
+    )
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_load_initial_conftests(early_config, parser, args):
+    package = early_config.known_args_namespace.spin_import
+    if not package:
+        return
+
+    try:
+        __import__(package)
+    except Exception:
+        traceback.print_exc()
+        raise pytest.UsageError(
+            f"As a sanity check, we tried to import {package}.\n"
+            "Stopping. Please investigate the build error."
+        ) from None
+
+
+def pytest_configure(config):
+    path = config.getoption("spin_durations")
+    shard = config.getoption("spin_shard")
+    if path or shard:
+        config.pluginmanager.register(_Scheduler(config, path, shard), "spin-scheduler")
+
+
+class _Scheduler:
+    def __init__(self, config, path: str | None, shard: str | None):
+        self.path = path
+        self.measured: dict[str, float] = {}
+
+        self.shard = None
+        self.n_collected = 0
+        if shard:
+            try:
+                i, n = (int(part) for part in shard.split("/"))
+            except ValueError:
+                i = n = 0
+            if not (1 <= i <= n):
+                raise pytest.UsageError(f"Invalid shard `{shard}`; expected I/N")
+            self.shard = (i, n)
+
+        # Set on pytest-xdist workers
+        self.is_worker = hasattr(config, "workerinput")
+        self.distributed = self.is_worker or bool(
+            getattr(config.option, "numprocesses", None)
+        )
+        # Workers must collect tests in the same order, so they use the
+        # durations the controller read, rather than reading them again
+        if self.is_worker:
+            self.durations = config.workerinput.get("spin_durations", {})
+        elif path:
+            self.durations = durations.load(path)
+        else:
+            self.durations = {}
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_configure_node(self, node):
+        node.workerinput["spin_durations"] = self.durations
+
+    # After other plugins deselected tests, e.g. with `-k` and `-m`
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(self, session, config, items):
+        test_ids = [durations.test_id(item.nodeid) for item in items]
+        if self.shard:
+            i, n = self.shard
+            shards = durations.shard(test_ids, self.durations, n)
+            in_shard = [j for j, s in enumerate(shards) if s == i - 1]
+            if len(in_shard) < len(items):
+                config.hook.pytest_deselected(
+                    items=[items[j] for j, s in enumerate(shards) if s != i - 1]
+                )
+            self.n_collected = len(items)
+            items[:] = [items[j] for j in in_shard]
+            test_ids = [test_ids[j] for j in in_shard]
+
+        if self.distributed:
+            order = durations.schedule(test_ids, self.durations)
+            items[:] = [items[j] for j in order]
+
+    def pytest_report_collectionfinish(self, config, items):
+        if self.shard:
+            i, n = self.shard
+            expected = sum(
+                durations.estimate(
+                    [durations.test_id(item.nodeid) for item in items],
+                    self.durations,
+                )
+            )
+            return f"shard {i}/{n}: {len(items)} of {self.n_collected} tests" + (
+                f", expected to take {expected:.1f}s" if self.durations else ""
+            )
+
+    def pytest_runtest_logreport(self, report):
+        # With pytest-xdist, the controller receives the workers' reports
+        if not self.is_worker:
+            test_id = durations.test_id(report.nodeid)
+            self.measured[test_id] = self.measured.get(test_id, 0.0) + report.duration
+
+    def pytest_sessionfinish(self, session, exitstatus):
+        # A shard may be left without tests
+        if self.shard and exitstatus == pytest.ExitCode.NO_TESTS_COLLECTED:
+            session.exitstatus = pytest.ExitCode.OK
+
+        if self.path and self.measured and not (self.is_worker or self.shard):
+            try:
+                durations.record(self.path, self.measured)
+            except (OSError, sqlite3.Error) as e:
+                reporter = session.config.pluginmanager.get_plugin("terminalreporter")
+                if reporter is not None:
+                    reporter.write_line(f"Could not record test durations: {e}")
@@ -0,0 +1,135 @@
+"""Find the CPUs and memory available to builds, to choose a number of
+build jobs.
+
+CPUs are limited by the CPU affinity of this process and by cgroup CPU
+quotas; memory by the kernel's estimate of available memory
+(`MemAvailable`) and by cgroup memory limits.  Both cgroup v1 and v2 are
+supported.  The memory needed per build job is learned from the peak
+memory use of recent builds, which are kept in the project cache.
+"""
+
+import contextlib
+import math
+import os
+
+from . import cache
+
+# Memory assumed to be used per build job, until builds have been measured
+DEFAULT_MEMORY_PER_JOB = 2**30
+
+# Number of builds whose peak memory use is remembered
+_MEMORY_SAMPLES = 5
+
+
+def _read_int(path: str | None) -> int | None:
+    """Integer in the file `path`, or None (also for cgroup's `max`)."""
+    if path is None:
+        return None
+    try:
+        with open(path) as f:
+            return int(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _cgroup_file(controller: str, name: str) -> str | None:
+    """Path of the cgroup interface file `name` of this process.
+
+    For cgroup v1, `controller` is the hierarchy to look in; for cgroup v2,
+    it is ignored.  If the cgroup of the process is not visible (as in
+    some containers), the root of the hierarchy is used.
+    """
+    try:
+        with open("/proc/self/cgroup") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+
+    for line in lines:
+        _, controllers, path = line.split(":", 2)
+        if controllers == "":
+            base = "/sys/fs/cgroup"
+        elif controller in controllers.split(","):
+            base = f"/sys/fs/cgroup/{controllers}"
+        else:
+            continue
+        for directory in (base + path, base):
+            fn = os.path.join(directory, name)
+            if os.path.exists(fn):
+                return fn
+    return None
+
+
+def default_ninja_jobs(n_cpus: int | None = None) -> int:
+    """Number of jobs ninja runs in parallel if not told otherwise."""
+    n_cpus = n_cpus or os.cpu_count() or 1
+    return n_cpus + 2 if n_cpus > 2 else n_cpus + 1
+
+
+def cpu_limit() -> tuple[int, str]:
+    """Number of CPUs this process may use, and where that number came from."""
+    if hasattr(os, "sched_getaffinity"):
+        n_cpus, source = len(os.sched_getaffinity(0)), "CPU affinity"
+    else:
+        n_cpus, source = os.cpu_count() or 1, "CPU count"
+
+    quota = period = None
+    if cpu_max := _cgroup_file("cpu", "cpu.max"):
+        with contextlib.suppress(OSError, ValueError):
+            with open(cpu_max) as f:
+                quota_str, period_str = f.read().split()
+            if quota_str != "max":
+                quota, period = int(quota_str), int(period_str)
+    else:
+        quota = _read_int(_cgroup_file("cpu", "cpu.cfs_quota_us"))
+        period = _read_int(_cgroup_file("cpu", "cpu.cfs_period_us"))
+
+    if quota and period and (quota > 0):
+        n_quota = max(1, math.ceil(quota / period))
+        if n_quota < n_cpus:
+            n_cpus, source = n_quota, "cgroup CPU quota"
+    return n_cpus, source
+
+
+def available_memory() -> tuple[int, str] | None:
+    """Bytes of memory available to this process, and where that number
+    came from, or None if unknown."""
+    candidates = []
+    with contextlib.suppress(OSError, ValueError, IndexError):
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    candidates.append((int(line.split()[1]) * 1024, "MemAvailable"))
+
+    for limit_file, usage_file in (
+        ("memory.max", "memory.current"),
+        ("memory.limit_in_bytes", "memory.usage_in_bytes"),
+    ):
+        limit = _read_int(_cgroup_file("memory", limit_file))
+        # cgroup v1 reports a huge number if there is no limit
+        if limit and (limit < 2**60):
+            usage = _read_int(_cgroup_file("memory", usage_file)) or 0
+            candidates.append((max(0, limit - usage), "cgroup memory limit"))
+            break
+
+    return min(candidates) if candidates else None
+
+
+def _memory_samples_path() -> str:
+    return os.path.join(cache.project_cache_dir(), "build-memory.pickle")
+
+
+def memory_per_job() -> tuple[int, str]:
+    """Memory needed per build job, and where that estimate came from: the
+    largest peak memory use of a build step in recent builds."""
+    samples = cache.load(_memory_samples_path(), [])
+    if samples:
+        return max(samples), "peak use in recent builds"
+    return DEFAULT_MEMORY_PER_JOB, "default"
+
+
+def record_peak_memory(peak: int | None):
+    """Remember `peak`, the peak memory use of a build, in bytes."""
+    if peak:
+        samples = cache.load(_memory_samples_path(), [])
+        cache.store(_memory_samples_path(), (samples + [peak])[-_MEMORY_SAMPLES:])
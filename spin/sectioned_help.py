@@ -1,22 +1,182 @@
 import collections
+import collections.abc
 
 import click
 
 
 class SectionedHelpGroup(click.Group):
-    """Organize commands as sections"""
+    """Organize commands as sections
+
+    Commands can also be added lazily, with `add_lazy_command`.  Those are
+    listed (in help and shell completion) from a description only, and
+    are loaded the first time they are invoked.
+    """
 
     def __init__(self, *args, **kwargs):
-        self.section_commands = collections.defaultdict(list)
+        self._sections = collections.defaultdict(list)
+        self._lazy_commands = {}
+        self._placeholders = {}
         super().__init__(*args, **kwargs)
 
+    @property
+    def section_commands(self):
+        """Commands, by section. Lazy commands are loaded on access."""
+        return _SectionCommands(self)
+
     def add_command(self, cmd, name=None, section=None):
-        self.section_commands[section].append(cmd)
+        name = name or cmd.name
+        self._sections[section].append(name)
         super().add_command(cmd, name=name)
 
+    def add_lazy_command(self, name, loader, section=None, short_help="", params=()):
+        """Add a command without loading it.
+
+        Parameters
+        ----------
+        name : str
+            Command name.
+        loader : callable
+            Called without arguments to load the command, the first time
+            it is needed.  May return None if the command cannot be loaded.
+        section : str
+            Help section to list the command under.
+        short_help : str
+            Help shown in the command listing.
+        params : list of dict
+            Description of the command parameters, as produced by
+            `describe_params`.  Used for shell completion.
+        """
+        self._sections[section].append(name)
+        self._lazy_commands[name] = (loader, short_help, params)
+
+    def _load_command(self, name):
+        if name in self._lazy_commands:
+            loader, _, _ = self._lazy_commands.pop(name)
+            cmd = loader()
+            if cmd is not None:
+                super().add_command(cmd, name=name)
+        return self.commands.get(name)
+
+    def get_command(self, ctx, cmd_name):
+        if (cmd_name in self._lazy_commands) and ctx.resilient_parsing:
+            # Shell completion: describe the command without loading it
+            if cmd_name not in self._placeholders:
+                _, short_help, params = self._lazy_commands[cmd_name]
+                self._placeholders[cmd_name] = _placeholder_command(
+                    cmd_name, short_help, params
+                )
+            return self._placeholders[cmd_name]
+        return self._load_command(cmd_name)
+
+    def list_commands(self, ctx):
+        return sorted(set(self.commands) | set(self._lazy_commands))
+
+    def _short_help(self, name):
+        if name in self._lazy_commands:
+            return self._lazy_commands[name][1]
+        return self.commands[name].get_short_help_str() or ""
+
     def format_commands(self, ctx, formatter):
-        for group, cmds in self.section_commands.items():
+        for group, names in self._sections.items():
             with formatter.section(group):
-                formatter.write_dl(
-                    [(cmd.name, cmd.get_short_help_str() or "") for cmd in cmds]
-                )
+                formatter.write_dl([(name, self._short_help(name)) for name in names])
+
+
+class _SectionCommands(collections.abc.Mapping):
+    """Read-only mapping of section name to list of commands."""
+
+    def __init__(self, group):
+        self._group = group
+
+    def __getitem__(self, section):
+        if section not in self._group._sections:
+            raise KeyError(section)
+        cmds = (
+            self._group._load_command(name) for name in self._group._sections[section]
+        )
+        return [cmd for cmd in cmds if cmd is not None]
+
+    def __iter__(self):
+        return iter(self._group._sections)
+
+    def __len__(self):
+        return len(self._group._sections)
+
+
+def describe_params(cmd):
+    """Describe the parameters of `cmd` using only built-in types.
+
+    The description can be stored, and later be used to offer shell
+    completion for the command without loading it.
+    """
+    params = []
+    for param in cmd.params:
+        if param.name is None:
+            continue
+        if isinstance(param.type, click.Choice):
+            param_type = ["choice", [str(c) for c in param.type.choices]]
+        elif isinstance(param.type, click.Path | click.File):
+            param_type = ["path", None]
+        else:
+            param_type = [None, None]
+        params.append(
+            {
+                "kind": "argument" if isinstance(param, click.Argument) else "option",
+                "name": param.name,
+                "opts": list(param.opts),
+                "secondary_opts": list(param.secondary_opts),
+                "nargs": param.nargs,
+                "multiple": param.multiple,
+                "is_flag": getattr(param, "is_flag", False),
+                "count": getattr(param, "count", False),
+                "hidden": getattr(param, "hidden", False),
+                "help": getattr(param, "help", None),
+                "type": param_type,
+            }
+        )
+    return params
+
+
+def _placeholder_command(name, short_help, params):
+    """Stand-in command, reconstructed from its description, for completion."""
+    return click.Command(
+        name,
+        short_help=short_help,
+        params=[_param_from_description(p) for p in params],
+        context_settings={"ignore_unknown_options": True},
+    )
+
+
+def _param_from_description(desc):
+    kind, choices = desc["type"]
+    if kind == "choice":
+        param_type = click.Choice(choices)
+    elif kind == "path":
+        param_type = click.Path()
+    else:
+        param_type = None
+
+    if desc["kind"] == "argument":
+        return click.Argument(
+            [desc["name"]], nargs=desc["nargs"], type=param_type, required=False
+        )
+
+    if desc["is_flag"] or desc["count"]:
+        option = click.Option(
+            desc["opts"] + [desc["name"]],
+            is_flag=desc["is_flag"],
+            count=desc["count"],
+            hidden=desc["hidden"],
+            help=desc["help"],
+        )
+        option.secondary_opts = desc["secondary_opts"]
+    else:
+        option = click.Option(
+            desc["opts"] + [desc["name"]],
+            nargs=desc["nargs"],
+            multiple=desc["multiple"],
+            type=param_type,
+            hidden=desc["hidden"],
+            help=desc["help"],
+        )
+    return option
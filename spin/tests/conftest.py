@@ -19,6 +19,15 @@ def dir_switcher(path):
         os.chdir(cwd)
 
 
+@pytest.fixture(autouse=True, scope="session")
+def spin_cache_dir(tmp_path_factory):
+    """Keep spin's persistent caches out of the user's cache directory."""
+    cache_dir = tmp_path_factory.mktemp("spin-cache")
+    os.environ["SPIN_CACHE_DIR"] = str(cache_dir)
+    yield cache_dir
+    del os.environ["SPIN_CACHE_DIR"]
+
+
 @pytest.fixture()
 def example_pkg():
     yield from dir_switcher("example_pkg")
@@ -1,7 +1,10 @@
+import json
 import os
+import shutil
 import subprocess
 import sys
 import tempfile
+import time
 from pathlib import Path, PureWindowsPath
 
 import pytest
@@ -33,6 +36,279 @@ def test_basic_build(example_pkg):
     )
 
 
+def test_noop_build(example_pkg):
+    """Does an unchanged tree skip Meson, unless forced or modified?"""
+    spin("build")
+
+    p = spin("build")
+    assert "No changes since the last build" in stdout(p)
+    assert "meson install" not in stdout(p)
+
+    p = spin("build", "--force")
+    assert "No changes" not in stdout(p)
+
+    # Touching a tracked file does not change it
+    os.utime("example_pkg/__init__.py")
+    p = spin("build")
+    assert "No changes since the last build" in stdout(p)
+
+    with open("example_pkg/__init__.py") as f:
+        source = f.read()
+    try:
+        with open("example_pkg/__init__.py", "a") as f:
+            f.write("\n# A change\n")
+        p = spin("build")
+        assert "No changes" not in stdout(p)
+    finally:
+        with open("example_pkg/__init__.py", "w") as f:
+            f.write(source)
+    spin("build")
+
+    # Ignored files are not sources, but untracked ones may be
+    os.makedirs("doc/_build")
+    Path("doc/_build/index.html").touch()
+    p = spin("build")
+    assert "No changes since the last build" in stdout(p)
+
+    Path("example_pkg/new_module.py").touch()
+    p = spin("build")
+    assert "No changes" not in stdout(p)
+
+    p = spin("build", env={**os.environ, "CFLAGS": "-O0"})
+    assert "No changes" not in stdout(p)
+
+
+def test_reconfigure(example_pkg):
+    """Is the build directory reconfigured when setup arguments change?"""
+
+    def buildtype():
+        with open("build/meson-info/intro-buildoptions.json") as f:
+            options = json.load(f)
+        return next(o["value"] for o in options if o["name"] == "buildtype")
+
+    spin("build")
+    assert buildtype() == "debugoptimized"
+
+    p = spin("build", "--", "-Dbuildtype=debug")
+    assert "--reconfigure" in stdout(p)
+    assert buildtype() == "debug"
+
+    # Meson keeps options that are no longer given
+    p = spin("build", "--force")
+    assert "--reconfigure" not in stdout(p)
+    assert buildtype() == "debug"
+
+    p = spin("build", env={**os.environ, "CFLAGS": "-O0"})
+    assert "--wipe" in stdout(p)
+    assert buildtype() == "debug"
+
+
+def test_clean(example_pkg):
+    """Are build outputs removed, selectively if requested?"""
+    spin("build")
+
+    # Directories not configured by Meson are left alone
+    p = spin("clean", "-C", "example_pkg", sys_exit=False)
+    assert p.returncode != 0
+    assert "is not a Meson build directory" in stderr(p)
+    assert os.path.isfile("example_pkg/__init__.py")
+
+    spin("clean", "--install")
+    assert os.path.isdir("build")
+    assert not os.path.exists("build-install")
+
+    spin("clean")
+    assert not os.path.exists("build")
+
+    # Contents are deleted in the background
+    for _ in range(100):
+        if not os.path.exists(".spin-trash"):
+            break
+        time.sleep(0.1)
+    assert not os.path.exists(".spin-trash")
+
+    spin("build")
+    p = spin("build", "--clean")
+    assert "Removing `build`" in stdout(p)
+    assert os.path.isdir("build-install")
+
+
+def test_gc(example_pkg):
+    """Are least recently used build directories removed?"""
+    spin("build")
+    for i, name in enumerate(["build-old", "build-older"]):
+        shutil.copytree("build", name, symlinks=True)
+        shutil.copytree("build-install", f"{name}-install", symlinks=True)
+        os.utime(os.path.join(name, "spin-info", "last-used"), (0, 1000 - i))
+
+    p = spin("gc")
+    assert [line.split()[-1] for line in stdout(p).splitlines()] == [
+        "build",
+        "build-old",
+        "build-older",
+    ]
+
+    # The current build directory is kept, even if it is not the most recent
+    p = spin("gc", "--max-dirs=1", "--dry-run", "-C", "build-older")
+    assert stdout(p).splitlines() == [
+        "Would remove `build`",
+        "Would remove `build-old`",
+    ]
+
+    spin("gc", "--max-dirs=2")
+    assert os.path.isdir("build")
+    assert os.path.isdir("build-old")
+    assert not os.path.exists("build-older")
+
+    # Using a build directory makes it the most recent
+    spin("run", "--no-build", "-C", "build-old", "true")
+    p = spin("gc")
+    assert [line.split()[-1] for line in stdout(p).splitlines()] == [
+        "build-old",
+        "build",
+    ]
+
+
+@skip_unless_linux
+def test_monitor(example_pkg):
+    """Are processes run by the build monitored?"""
+    p = spin("build", "--monitor")
+    assert "by peak memory use" in stdout(p)
+
+    with open("build/spin-info/monitor-build.json") as f:
+        monitor = json.load(f)
+    assert any("setup" in p["cmdline"] for p in monitor["processes"])
+
+
+def test_direct_build(example_pkg):
+    """Does spin install the same files as `meson install`?"""
+
+    def installed_files():
+        return sorted(
+            str(p.relative_to("build-install"))
+            for p in Path("build-install").rglob("*")
+            if p.is_file() and "__pycache__" not in p.parts
+        )
+
+    spin("build")
+    expected = installed_files()
+
+    shutil.rmtree("build-install")
+    p = spin("build", "--direct", "--force")
+    assert "meson install" not in stdout(p)
+    assert installed_files() == expected
+
+
+@skip_on_windows
+def test_linked_install(example_pkg):
+    """Are installed files linked, and are stale links removed?"""
+    spin("build", "--install-mode=symlink")
+    installed = next(Path("build-install").rglob("example_pkg/__init__.py"))
+    assert installed.is_symlink()
+    assert installed.resolve() == Path("example_pkg/__init__.py").resolve()
+
+    spin("build", "--install-mode=hardlink")
+    assert not installed.is_symlink()
+    assert installed.samefile("example_pkg/__init__.py")
+
+    # Files removed from the sources are removed from the install
+    extra = Path("example_pkg/submodule/extra.py")
+    extra.write_text("")
+    spin("build", "--install-mode=hardlink")
+    installed_extra = installed.parent / "submodule" / "extra.py"
+    assert installed_extra.samefile(extra)
+
+    extra.unlink()
+    spin("build", "--install-mode=hardlink")
+    assert not installed_extra.exists()
+
+    # Switching back to `meson install` replaces links by copies
+    spin("build")
+    assert not installed.samefile("example_pkg/__init__.py")
+
+
+FAKE_CCACHE = """\
+#!/bin/sh
+# A cache directory in `ccache.conf` is emulated by `$FAKE_CCACHE_CONF_DIR`
+dir="${CCACHE_DIR:-$FAKE_CCACHE_CONF_DIR}"
+case "$1" in
+  --version) echo "ccache version 4.8.0"; exit 0;;
+  --show-config)
+    if [ -n "$FAKE_CCACHE_CONF_DIR" ]; then
+      echo "(/etc/ccache.conf) cache_dir = $FAKE_CCACHE_CONF_DIR"
+    else
+      echo "(default) cache_dir = $HOME/.cache/ccache"
+    fi
+    echo "(default) max_size = 5.0G"
+    exit 0;;
+  --print-stats)
+    printf 'direct_cache_hit\\t0\\ncache_miss\\t%s\\n' "$(cat "$dir/n" || echo 0)"
+    exit 0;;
+esac
+mkdir -p "$dir"
+echo $(( $(cat "$dir/n" || echo 0) + 1 )) > "$dir/n"
+exec "$@"
+"""
+
+
+@skip_on_windows
+def test_compiler_cache(example_pkg, tmp_path):
+    """Is ccache picked up, with a per-project cache, and are stats reported?"""
+    ccache = tmp_path / "ccache"
+    ccache.write_text(FAKE_CCACHE)
+    ccache.chmod(0o755)
+
+    env = {**os.environ, "PATH": f"{tmp_path}{os.pathsep}{os.environ['PATH']}"}
+    env.pop("CCACHE_DIR", None)
+    p = spin("build", env=env)
+    assert "ccache: 0 hits, 1 misses" in stdout(p)
+    cache_dir = Path(os.environ["SPIN_CACHE_DIR"])
+    assert any(cache_dir.glob("projects/*/compiler-cache/ccache/n"))
+
+
+@skip_on_windows
+def test_compiler_cache_configured(example_pkg, tmp_path):
+    """Is a cache directory configured in `ccache.conf` kept?"""
+    ccache = tmp_path / "ccache"
+    ccache.write_text(FAKE_CCACHE)
+    ccache.chmod(0o755)
+    shared = tmp_path / "shared-cache"
+
+    env = {
+        **os.environ,
+        "PATH": f"{tmp_path}{os.pathsep}{os.environ['PATH']}",
+        "FAKE_CCACHE_CONF_DIR": str(shared),
+        "SPIN_CACHE_DIR": str(tmp_path / "spin-cache"),
+    }
+    env.pop("CCACHE_DIR", None)
+    p = spin("build", env=env)
+    assert "ccache: 0 hits, 1 misses" in stdout(p)
+    assert (shared / "n").exists()
+    assert not any((tmp_path / "spin-cache").glob("projects/*/compiler-cache"))
+
+
+def test_concurrent_builds(example_pkg):
+    """Are several build directories, and profiles, built together?"""
+    p = spin("build", "-j", 2, "-C", "build", "--profile", "debug")
+    output = stdout(p)
+    assert "Build summary" in output
+    assert "build-debug |" in output
+
+    for build_dir in ("build", "build-debug"):
+        assert Path(f"{build_dir}-install").exists()
+
+    with open("build-debug/meson-info/intro-buildoptions.json") as f:
+        options = {opt["name"]: opt["value"] for opt in json.load(f)}
+    assert options["buildtype"] == "debug"
+
+
+def test_build_dir_from_environment(example_pkg):
+    """Is `SPIN_BUILD_DIR` one build directory, even if it contains spaces?"""
+    spin("build", env={**os.environ, "SPIN_BUILD_DIR": "my build"})
+    assert Path("my build-install").exists()
+    assert not Path("my").exists()
+
+
 def test_debug_builds(example_pkg):
     """Does spin generate gcov debug output files?"""
     spin("build", "--gcov")
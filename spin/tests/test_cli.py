@@ -1,3 +1,5 @@
+import os
+
 import spin as libspin
 
 from .testutil import spin, stdout
@@ -15,3 +17,33 @@ def test_arg_override(example_pkg):
 
     p = spin("example", "-t", 6)
     assert "--test is: 6" in stdout(p)
+
+
+def test_help_from_manifest(example_pkg):
+    # The first call records the command manifest, the second uses it
+    first = stdout(spin("--help"))
+    second = stdout(spin("--help"))
+    assert first == second
+    assert "🧪 Example custom command." in second
+
+
+def test_completion_from_manifest(example_pkg):
+    for shell, comp_cword in (("bash", "1"), ("zsh", "1"), ("fish", "b")):
+        env = {
+            **os.environ,
+            "_SPIN_COMPLETE": f"{shell}_complete",
+            "COMP_WORDS": "spin b",
+            "COMP_CWORD": comp_cword,
+        }
+        expected = stdout(spin(env={**env, "SPIN_NO_CACHE": "1"}))
+        assert "build" in expected
+
+        # Once to record the manifest, once to use it
+        assert stdout(spin(env=env)) == expected
+        assert stdout(spin(env=env)) == expected
+
+
+def test_version_without_config(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    p = spin("--version")
+    assert stdout(p) == f"spin {libspin.__version__}"
@@ -0,0 +1,103 @@
+import copy
+import pickle
+
+import pytest
+
+from spin.containers import DotDict
+
+
+def make_config():
+    return DotDict(
+        {
+            "project": {"name": "pkg"},
+            "tool": {"spin": {"package": "pkg", "meson": {"cli": "meson"}}},
+        }
+    )
+
+
+def test_dotted_lookup():
+    cfg = make_config()
+    assert cfg["project.name"] == "pkg"
+    assert cfg["tool.spin.meson.cli"] == "meson"
+    assert cfg["tool.spin"]["package"] == "pkg"
+    assert "tool.spin.meson" in cfg
+    assert "tool.spin.missing" not in cfg
+    assert "project.name.x" not in cfg
+    assert cfg.get("tool.spin.missing", 5) == 5
+
+    with pytest.raises(KeyError, match="`tool.foo` not found"):
+        cfg["tool.foo"]
+    with pytest.raises(KeyError, match="`project.name.x` not found"):
+        cfg["project.name.x"]
+    assert 1 not in cfg
+
+
+def test_lookup_follows_mutation():
+    cfg = make_config()
+    assert cfg["tool.spin.package"] == "pkg"
+
+    # Nested modification
+    cfg["tool.spin"]["package"] = "other"
+    assert cfg["tool.spin.package"] == "other"
+
+    cfg["tool.spin"]["kwargs"] = {"cmd": {"a": 1}}
+    assert cfg["tool.spin.kwargs.cmd.a"] == 1
+
+    cfg["tool.spin.kwargs.cmd"].update(b=2)
+    assert cfg["tool.spin.kwargs.cmd.b"] == 2
+
+    del cfg["tool.spin"]["meson"]
+    assert "tool.spin.meson.cli" not in cfg
+
+    cfg["tool"].pop("spin")
+    assert "tool.spin" not in cfg
+    assert "tool" in cfg
+
+    # Top-level modification
+    cfg["build-system"] = {"requires": ["meson-python"]}
+    assert cfg["build-system.requires"] == ["meson-python"]
+
+    del cfg["project"]
+    assert "project.name" not in cfg
+
+    cfg.data = {"project": {"name": "new"}}
+    assert cfg["project.name"] == "new"
+
+
+def test_copies():
+    cfg = make_config()
+    assert cfg["project.name"] == "pkg"
+
+    for cfg2 in (cfg.copy(), copy.copy(cfg)):
+        assert cfg2["project.name"] == "pkg"
+        cfg2["project"] = {"name": "other"}
+        assert cfg2["project.name"] == "other"
+        assert cfg["project.name"] == "pkg"
+
+
+def test_nested_dicts_are_not_copied():
+    data = {"tool": {"spin": {"package": "pkg"}}}
+    cfg = DotDict(data)
+    spin_cfg = cfg.data["tool"]["spin"]
+    assert cfg["tool.spin.package"] == "pkg"
+    assert cfg["tool.spin"] is data["tool"]["spin"]
+
+    # References taken before or after a lookup stay attached
+    spin_cfg["package"] = "other"
+    assert cfg["tool.spin.package"] == "other"
+    cfg["tool.spin"]["commands"] = ["spin.cmds.meson.build"]
+    assert data["tool"]["spin"]["commands"] == ["spin.cmds.meson.build"]
+
+    # Replaced nested dictionaries
+    cfg["tool"]["spin"] = {"package": "new"}
+    assert cfg["tool.spin.package"] == "new"
+    assert "tool.spin.commands" not in cfg
+
+
+def test_nested_dicts_serialize_as_dicts():
+    cfg = make_config()
+    spin_cfg = cfg["tool.spin"]
+
+    assert isinstance(spin_cfg, dict)
+    assert type(pickle.loads(pickle.dumps(spin_cfg))) is dict
+    assert copy.deepcopy(spin_cfg) == spin_cfg
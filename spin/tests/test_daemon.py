@@ -0,0 +1,64 @@
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from spin import daemon
+from spin.cmds.util import run
+
+from .testutil import spin, stderr, stdout
+
+pytestmark = pytest.mark.skipif(
+    not daemon.supported(), reason="Skipped; daemon not supported on platform"
+)
+
+
+def spinc(*args, **kwargs):
+    return run(
+        ["spinc"] + [str(el) for el in args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        sys_exit=False,
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def spin_daemon(example_pkg):
+    spin("daemon", "start", "--idle-timeout", 60)
+    yield daemon.status()
+    spin("daemon", "stop")
+
+
+def test_client_without_daemon(example_pkg):
+    assert daemon.status() is None
+    assert stdout(spinc("example")) == stdout(spin("example"))
+
+
+def test_client_with_daemon(spin_daemon):
+    assert spin_daemon is not None
+    assert "serving" in stdout(spin("daemon", "status"))
+
+    assert stdout(spinc("example", "-t", 6)) == stdout(spin("example", "-t", 6))
+
+    # Exit code and standard error are those of the worker
+    p = spinc("no-such-command")
+    assert p.returncode == 2
+    assert "No such command" in stderr(p)
+
+
+def test_server_per_environment(monkeypatch):
+    path = daemon.socket_path()
+    monkeypatch.setattr(sys, "prefix", "/other/venv")
+    assert daemon.socket_path() != path
+
+
+def test_stalled_client(spin_daemon):
+    """Does a client that sends no request block other clients?"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stalled:
+        stalled.connect(daemon.socket_path())
+        start = time.monotonic()
+        assert daemon.status() is not None
+        assert time.monotonic() - start < 2 * daemon._REQUEST_TIMEOUT
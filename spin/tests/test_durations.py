@@ -0,0 +1,62 @@
+from spin import durations
+
+
+def test_record(tmp_path):
+    db = str(tmp_path / "cache" / "durations.sqlite")
+    assert durations.load(db) == {}
+
+    durations.record(db, {"test_a.py::test_a": 2.0, "test_b.py::test_b": 1.0})
+    durations.record(db, {"test_a.py::test_a": 4.0})
+    assert durations.load(db) == {"test_a.py::test_a": 3.0, "test_b.py::test_b": 1.0}
+
+
+def test_estimate():
+    recorded = {"a": 4.0, "b": 2.0}
+    assert durations.estimate(["a", "b", "c"], recorded) == [4.0, 2.0, 3.0]
+    assert durations.estimate(["c", "d"], {}) == [1.0, 1.0]
+
+
+def test_test_id():
+    assert durations.test_id(
+        "build-install/usr/lib/python3.12/site-packages/pkg/tests/test_a.py::test_a"
+    ) == ("pkg/tests/test_a.py::test_a")
+    assert durations.test_id("tests/test_a.py::test_a[site-packages/]") == (
+        "tests/test_a.py::test_a[site-packages/]"
+    )
+
+
+def test_schedule():
+    test_ids = [
+        "test_a.py::test_1",
+        "test_a.py::TestA::test_2",
+        "test_b.py::test_1",
+        "test_b.py::test_2",
+        "test_c.py::test_1",
+    ]
+    recorded = {
+        "test_a.py::test_1": 1.0,
+        "test_a.py::TestA::test_2": 1.0,
+        "test_b.py::test_1": 0.5,
+        "test_b.py::test_2": 5.0,
+        "test_c.py::test_1": 3.0,
+    }
+    # Files are ordered by their total duration; tests within them are not
+    assert durations.schedule(test_ids, recorded) == [2, 3, 4, 0, 1]
+
+
+def test_shard():
+    test_ids = [f"test_{i}" for i in range(6)]
+    recorded = {"test_0": 6.0, "test_1": 4.0, "test_2": 3.0, "test_3": 2.0}
+    shards = durations.shard(test_ids, recorded, 2)
+    # Tests without durations are expected to take the average, 3.75
+    loads = [0.0, 0.0]
+    for test_id, s in zip(test_ids, shards, strict=True):
+        loads[s] += recorded.get(test_id, 3.75)
+    assert loads == [11.75, 10.75]
+
+    # The partition does not depend on the order of the tests
+    reordered = durations.shard(test_ids[::-1], recorded, 2)
+    assert reordered == shards[::-1]
+
+    # Without durations, shards have equal numbers of tests
+    assert sorted(durations.shard(test_ids, {}, 4)) == [0, 0, 1, 1, 2, 3]
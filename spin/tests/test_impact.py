@@ -0,0 +1,66 @@
+import os
+
+from spin import impact
+
+
+def test_module_name():
+    assert impact.module_name("pkg/__init__.py") == "pkg"
+    assert impact.module_name("pkg/sub/mod.py") == "pkg.sub.mod"
+    assert impact.module_name("pkg/_core.cpython-311-x86_64-linux-gnu.so") == (
+        "pkg._core"
+    )
+    assert impact.module_name("pkg/data.json") is None
+    assert impact.module_name("pkg-1.0.dist-info/mod.py") is None
+
+
+def test_dependents(tmp_path):
+    files = {
+        "pkg/__init__.py": "from . import a\n",
+        "pkg/a.py": "from .b import f\n",
+        "pkg/b.py": "def f(): pass\n",
+        "pkg/c.py": "import os\n",
+        "tests/test_a.py": "import pkg.a\n",
+        "tests/test_c.py": "from pkg import c\n",
+    }
+    modules = {}
+    for name, source in files.items():
+        path = os.path.join(tmp_path, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(source)
+        modules[path] = None if name.startswith("tests") else impact.module_name(name)
+
+    graph = impact.update_graph({}, modules)
+    path = os.path.join(tmp_path, "pkg/b.py")
+    assert graph[path]["module"] == "pkg.b"
+
+    def affected(name):
+        paths = impact.dependents(graph, {os.path.join(tmp_path, name)})
+        return sorted(os.path.relpath(p, tmp_path) for p in paths)
+
+    assert affected("pkg/b.py") == [
+        "pkg/__init__.py",
+        "pkg/a.py",
+        "pkg/b.py",
+        "tests/test_a.py",
+        "tests/test_c.py",
+    ]
+    assert affected("pkg/c.py") == ["pkg/c.py", "tests/test_c.py"]
+
+    # Only changed files are parsed again
+    graph[path]["imports"] = ["sentinel"]
+    assert impact.update_graph(graph, modules)[path]["imports"] == ["sentinel"]
+    with open(path, "a") as f:
+        f.write("import pkg.c\n")
+    graph = impact.update_graph(graph, modules)
+    assert "pkg.c" in graph[path]["imports"]
+
+
+def test_update_coverage_map():
+    coverage_map = {"a.py": ["t1", "t2"], "b.py": ["t2"]}
+    tests = {"t2", "t3"}
+    files = {"a.py": ["t3"], "c.py": ["t2"]}
+    assert impact.update_coverage_map(coverage_map, tests, files) == {
+        "a.py": ["t1", "t3"],
+        "c.py": ["t2"],
+    }
@@ -0,0 +1,40 @@
+from spin import __main__ as spin_main
+
+
+def test_config_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "pyproject.toml").write_text('[tool.spin]\npackage = "pkg"\n')
+
+    assert spin_main._load_configs() == [{"tool": {"spin": {"package": "pkg"}}}]
+
+    # Unchanged configuration is loaded without parsing
+    def fail(filename):
+        raise AssertionError(f"{filename} parsed again")
+
+    with monkeypatch.context() as m:
+        m.setattr(spin_main, "_load_toml", fail)
+        assert spin_main._load_configs() == [{"tool": {"spin": {"package": "pkg"}}}]
+
+    # Changed configuration is parsed again
+    (tmp_path / "pyproject.toml").write_text('[tool.spin]\npackage = "other"\n')
+    assert spin_main._load_configs() == [{"tool": {"spin": {"package": "other"}}}]
+
+    # Invalid configuration is reported, and not cached
+    (tmp_path / "spin.toml").write_text("[tool.spin\n")
+    assert spin_main._load_configs() == [None, {"tool": {"spin": {"package": "other"}}}]
+
+
+def test_config_cache_disabled(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("SPIN_NO_CACHE", "1")
+    (tmp_path / "pyproject.toml").write_text('[tool.spin]\npackage = "pkg"\n')
+
+    parsed = []
+    load_toml = spin_main._load_toml
+    monkeypatch.setattr(
+        spin_main, "_load_toml", lambda fn: parsed.append(fn) or load_toml(fn)
+    )
+
+    spin_main._load_configs()
+    spin_main._load_configs()
+    assert parsed == ["pyproject.toml", "pyproject.toml"]
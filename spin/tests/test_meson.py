@@ -1,4 +1,6 @@
+import json
 import os
+import subprocess
 import sys
 import tempfile
 from os.path import join as pjoin
@@ -6,6 +8,7 @@ from os.path import normpath
 
 import pytest
 
+from spin import resources
 from spin.cmds import meson
 from spin.containers import DotDict
 
@@ -107,3 +110,252 @@ def test_meson_cli_discovery(monkeypatch):
 
         m.setattr(meson, "get_config", lambda: config1)
         assert meson._meson_cli()[0] == sys.executable
+
+
+def test_meson_version_cache(tmp_path, monkeypatch):
+    runner = tmp_path / "meson.py"
+    coredata = tmp_path / "mesonbuild" / "coredata.py"
+    coredata.parent.mkdir()
+    coredata.write_text("")
+    calls = tmp_path / "calls"
+    runner.write_text(
+        f"open({str(calls)!r}, 'a').write('x')\nprint(open({str(coredata)!r}).read() or '1.0.0')\n"
+    )
+    config = DotDict({"tool": {"spin": {"meson": {"cli": str(runner)}}}})
+    monkeypatch.setattr(meson, "get_config", lambda: config)
+    monkeypatch.setattr(meson, "_meson_versions", {})
+
+    assert meson._meson_version() == "1.0.0"
+    assert calls.read_text() == "x"
+
+    # Cached, both in-process and across invocations
+    assert meson._meson_version() == "1.0.0"
+    meson._meson_versions.clear()
+    assert meson._meson_version() == "1.0.0"
+    assert calls.read_text() == "x"
+
+    # Updating the vendored Meson invalidates the cache
+    coredata.write_text("1.1.0")
+    meson._meson_versions.clear()
+    assert meson._meson_version() == "1.1.0"
+    assert calls.read_text() == "xx"
+
+    # So does replacing it with a file of the same size and modification
+    # time, as `cp -p` does
+    replacement = tmp_path / "coredata.py"
+    replacement.write_text("1.2.0")
+    st = os.stat(coredata)
+    os.utime(replacement, ns=(st.st_atime_ns, st.st_mtime_ns))
+    os.replace(replacement, coredata)
+    meson._meson_versions.clear()
+    assert meson._meson_version() == "1.2.0"
+    assert calls.read_text() == "xxx"
+
+
+def test_auto_jobs(monkeypatch):
+    monkeypatch.setattr(resources, "cpu_limit", lambda: (64, "CPU affinity"))
+    monkeypatch.setattr(resources, "available_memory", lambda: (16 * 2**30, "test"))
+    config = DotDict({"tool": {"spin": {"meson": {"memory-per-job": "4G"}}}})
+    monkeypatch.setattr(meson, "get_config", lambda: config)
+
+    # Limited by memory
+    assert meson._auto_jobs() == 4
+
+    # Limited by CPUs, with ninja's default of two jobs more than CPUs
+    config["tool"]["spin"]["meson"]["memory-per-job"] = "100M"
+    assert meson._auto_jobs() == 66
+
+    # At least one job, even if memory is short
+    monkeypatch.setattr(resources, "available_memory", lambda: (0, "test"))
+    assert meson._auto_jobs() == 1
+
+
+def test_site_packages_cache(tmp_path, monkeypatch):
+    X, Y = sys.version_info.major, sys.version_info.minor
+    build_dir = str(tmp_path / "build")
+    install_dir = str(tmp_path / "build-install")
+    os.makedirs(build_dir)
+    # A `site-packages` inside an installed package is not considered
+    make_paths(install_dir, ["/Python3/site-packages/pkg/site-packages"])
+
+    site_packages = meson._get_site_packages(build_dir)
+    assert site_packages == normpath(pjoin(install_dir, "Python3/site-packages"))
+
+    # The recorded path is used, without walking the install directory
+    with monkeypatch.context() as m:
+        m.setattr(meson.os, "walk", None)
+        assert meson._get_site_packages(build_dir) == site_packages
+
+    # Changing the install directory invalidates the recorded path
+    make_paths(install_dir, [f"/usr/lib/python{X}.{Y}/site-packages"])
+    assert meson._get_site_packages(build_dir) == normpath(
+        pjoin(install_dir, f"usr/lib/python{X}.{Y}/site-packages")
+    )
+
+
+def test_editable_install_cache(tmp_path, monkeypatch):
+    calls = []
+
+    def find(distname):
+        calls.append(distname)
+        return "/src/pkg"
+
+    site_packages = tmp_path / "site-packages"
+    site_packages.mkdir()
+    project = tmp_path / "project"
+    project.mkdir()
+    monkeypatch.chdir(project)
+    # As with `python -m spin`
+    monkeypatch.setattr(sys, "path", ["", str(site_packages)])
+    monkeypatch.setattr(meson, "_find_editable_install_path", find)
+    monkeypatch.setattr(meson, "_editable_install_paths", {})
+
+    assert meson.editable_install_path("pkg") == "/src/pkg"
+    assert meson.editable_install_path("pkg") == "/src/pkg"
+    assert len(calls) == 1
+
+    # Cached across invocations
+    meson._editable_install_paths.clear()
+    assert meson.editable_install_path("pkg") == "/src/pkg"
+    assert len(calls) == 1
+
+    # Creating files in the project does not invalidate the cache
+    (project / "build").mkdir()
+    meson._editable_install_paths.clear()
+    assert meson.editable_install_path("pkg") == "/src/pkg"
+    assert len(calls) == 1
+
+    # Installing packages does
+    (site_packages / "other-1.0.dist-info").mkdir()
+    meson._editable_install_paths.clear()
+    assert meson.editable_install_path("pkg") == "/src/pkg"
+    assert len(calls) == 2
+
+
+def test_native_sources(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    build_dir = tmp_path / "build"
+    os.makedirs(build_dir / "meson-info")
+    core = str(build_dir / "pkg" / "_core.so")
+    util = str(build_dir / "libutil.a")
+    targets = [
+        {
+            "id": "core",
+            "filename": [core],
+            "depends": ["util"],
+            "target_sources": [{"sources": [str(tmp_path / "pkg" / "core.c")]}],
+        },
+        {
+            "id": "util",
+            "filename": [util],
+            "depends": [],
+            "target_sources": [{"sources": [str(tmp_path / "util.c")]}],
+        },
+    ]
+    with open(build_dir / "meson-info" / "intro-targets.json", "w") as f:
+        json.dump(targets, f)
+
+    sources = meson._native_sources(str(build_dir))
+    assert sources == {
+        str(tmp_path / "pkg" / "core.c"): {core},
+        str(tmp_path / "util.c"): {core, util},
+    }
+
+    deps = (
+        "libutil.a.p/util.c.o: #deps 3, deps mtime 1 (VALID)\n"
+        "    ../util.c\n"
+        "    ../util.h\n"
+        "    /usr/include/stdio.h\n"
+    )
+    monkeypatch.setattr(meson, "_ninja_cli", lambda: "ninja")
+    monkeypatch.setattr(
+        meson.subprocess,
+        "run",
+        lambda *args, **kwargs: subprocess.CompletedProcess(args, 0, deps.encode()),
+    )
+    sources = meson._native_sources(str(build_dir), includes=True)
+    assert sources[str(tmp_path / "util.h")] == {core, util}
+    assert "/usr/include/stdio.h" not in sources
+
+
+def test_source_tree_digest_without_git(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GIT_CEILING_DIRECTORIES", str(tmp_path.parent))
+    (tmp_path / ".gitignore").write_text("venv/\n")
+    os.makedirs("venv")
+    os.makedirs("build/meson-private")
+    (tmp_path / "mod.py").write_text("x = 1\n")
+    digest = meson._source_tree_digest(["build"])
+
+    # Ignored files and build directories are not sources
+    (tmp_path / "venv" / "lib.py").write_text("y = 1\n")
+    (tmp_path / "build" / "out.o").write_text("")
+    assert meson._source_tree_digest(["build"]) == digest
+
+    (tmp_path / "mod.py").write_text("x = 2\n")
+    assert meson._source_tree_digest(["build"]) != digest
+
+
+def test_share_jobs():
+    assert meson._share_jobs(8, 3) == [3, 3, 2]
+    assert meson._share_jobs(1, 1) == [1]
+
+    # More builds than jobs: builds are queued, one job each, so that no
+    # more than `total` jobs run at once
+    assert meson._share_jobs(3, 5) == [1, 1, 1, 1, 1]
+
+
+def test_build_concurrently_queues(tmp_path, capsys):
+    # Each build records whether another one was running at the same time
+    script = (
+        "import os, sys, time\n"
+        "lock = os.path.join(sys.argv[1], 'running')\n"
+        "overlap = os.path.exists(lock)\n"
+        "open(lock, 'w').close()\n"
+        "time.sleep(0.2)\n"
+        "os.remove(lock)\n"
+        "print('overlap' if overlap else 'alone')\n"
+    )
+    builds = [
+        {"build_dir": f"build-{i}", "cmd": [sys.executable, "-c", script, tmp_path]}
+        for i in range(3)
+    ]
+    for b in builds:
+        b["env"] = {}
+    meson._build_concurrently(builds, max_running=1)
+    assert all(b["returncode"] == 0 for b in builds)
+    out = capsys.readouterr().out
+    assert out.count("alone") == 3
+    assert "overlap" not in out
+
+
+@pytest.mark.skipif(not hasattr(os, "wait4"), reason="needs os.wait4")
+def test_run_compile_peak_memory():
+    allocate = [sys.executable, "-c", "b = bytearray(200 * 2**20)"]
+    assert meson._run_compile(allocate) >= 200 * 2**20
+
+    # Only the compile command counts, not other processes run before it
+    subprocess.run(allocate, check=True)
+    assert meson._run_compile([sys.executable, "-c", "pass"]) < 100 * 2**20
+
+    with pytest.raises(SystemExit):
+        meson._run_compile([sys.executable, "-c", "raise SystemExit(3)"], output=False)
+
+
+def test_build_concurrently_quiet(capsys):
+    builds = [
+        {"build_dir": "build-ok", "cmd": [sys.executable, "-c", "print('ok')"]},
+        {"build_dir": "build-bad", "cmd": [sys.executable, "-c", "exit('bad')"]},
+    ]
+    for b in builds:
+        b["env"] = {}
+    meson._build_concurrently(builds[:1], max_running=2, quiet=True)
+    assert capsys.readouterr().out == ""
+
+    # The output of failed builds is shown regardless
+    with pytest.raises(SystemExit):
+        meson._build_concurrently(builds, max_running=2, quiet=True)
+    out = capsys.readouterr().out
+    assert "bad" in out
+    assert "| ok" not in out
+    assert "Build summary" in out
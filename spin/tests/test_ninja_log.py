@@ -0,0 +1,34 @@
+from spin import ninja_log
+
+
+def test_read(tmp_path):
+    log = tmp_path / ".ninja_log"
+    previous_build = "0\t500\t1\tstale.o\taaa\n"
+    log.write_text("# ninja log v5\n" + previous_build)
+    position = ninja_log.position(str(tmp_path))
+
+    with open(log, "a") as f:
+        f.write(
+            "0\t100\t1\ta.o\th1\n"
+            "0\t300\t1\tb.o\th2\n"
+            "300\t400\t1\tlib.so\th3\n"
+            "300\t400\t1\tlib.so.1\th3\n"
+        )
+
+    steps = ninja_log.read(str(tmp_path), position)
+    assert steps == [
+        (0, 100, ["a.o"]),
+        (0, 300, ["b.o"]),
+        (300, 400, ["lib.so", "lib.so.1"]),
+    ]
+
+    # Without a position, the last build is found from its timestamps
+    assert ninja_log.read(str(tmp_path)) == steps
+
+    assert [outputs for _, _, outputs in ninja_log.critical_path(steps)] == [
+        ["b.o"],
+        ["lib.so", "lib.so.1"],
+    ]
+
+    trace = ninja_log.chrome_trace(steps)
+    assert sorted(event["tid"] for event in trace) == [0, 0, 1]
@@ -0,0 +1,19 @@
+import subprocess
+import sys
+
+from spin import procmon
+
+from .testutil import skip_unless_linux
+
+
+@skip_unless_linux
+def test_monitor():
+    script = "import time; x = bytearray(64 * 2**20); time.sleep(0.5)"
+    with procmon.Monitor(interval=0.05) as monitor:
+        subprocess.run([sys.executable, "-c", script], check=True)
+
+    (process,) = (p for p in monitor.processes if p["cmdline"][-1] == script)
+    assert process["peak_rss"] >= 64 * 2**20
+    assert process["end"] - process["start"] > 0.2
+    assert monitor.duration >= 0.5
+    assert 0 < monitor.overhead < monitor.duration
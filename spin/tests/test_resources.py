@@ -0,0 +1,27 @@
+from spin import resources
+
+
+def test_default_ninja_jobs():
+    assert resources.default_ninja_jobs(1) == 2
+    assert resources.default_ninja_jobs(2) == 3
+    assert resources.default_ninja_jobs(8) == 10
+
+
+def test_limits():
+    n_cpus, _ = resources.cpu_limit()
+    assert n_cpus >= 1
+    memory = resources.available_memory()
+    assert (memory is None) or (memory[0] >= 0)
+
+
+def test_memory_per_job(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert resources.memory_per_job() == (
+        resources.DEFAULT_MEMORY_PER_JOB,
+        "default",
+    )
+
+    # The largest of the last five peaks
+    for peak in (3, 1, None, 2) + (1,) * 3:
+        resources.record_peak_memory(peak)
+    assert resources.memory_per_job() == (2, "peak use in recent builds")
@@ -0,0 +1,74 @@
+import click
+from click.testing import CliRunner
+
+from spin.sectioned_help import SectionedHelpGroup, describe_params
+
+
+@click.command()
+@click.option("-v/-q", "--verbose/--quiet", default=True, help="Verbosity")
+@click.option("--fmt", type=click.Choice(["html", "xml"]), help="Output format")
+@click.argument("args", nargs=-1)
+def report(verbose, fmt, args):
+    """📊 Generate a report"""
+    click.echo(f"report {fmt}")
+
+
+def make_group(loaded):
+    def loader():
+        loaded.append("report")
+        return report
+
+    @click.group(cls=SectionedHelpGroup)
+    def group():
+        pass
+
+    group.add_lazy_command(
+        "report",
+        loader,
+        section="Reports",
+        short_help=report.get_short_help_str(),
+        params=describe_params(report),
+    )
+    return group
+
+
+def test_lazy_help_does_not_load():
+    loaded = []
+    group = make_group(loaded)
+
+    result = CliRunner().invoke(group, ["--help"])
+    assert result.exit_code == 0
+    assert "Reports:" in result.output
+    assert "📊 Generate a report" in result.output
+    assert loaded == []
+
+
+def test_lazy_invoke_loads_once():
+    loaded = []
+    group = make_group(loaded)
+
+    result = CliRunner().invoke(group, ["report", "--fmt", "xml"])
+    assert result.exit_code == 0
+    assert "report xml" in result.output
+    assert loaded == ["report"]
+
+    ctx = click.Context(group)
+    assert group.get_command(ctx, "report") is report
+    assert list(group.section_commands["Reports"]) == [report]
+    assert loaded == ["report"]
+
+
+def test_lazy_completion_does_not_load():
+    loaded = []
+    group = make_group(loaded)
+
+    def complete(args, incomplete):
+        from click.shell_completion import ShellComplete
+
+        comp = ShellComplete(group, {}, "spin", "_SPIN_COMPLETE")
+        return [item.value for item in comp.get_completions(args, incomplete)]
+
+    assert complete([], "re") == ["report"]
+    assert "--quiet" in complete(["report"], "--")
+    assert complete(["report", "--fmt"], "") == ["html", "xml"]
+    assert loaded == []
@@ -49,3 +49,102 @@ def test_test_source_layout_explicit(example_pkg_src_layout):
     p = spin("test", "tests")
     # Ensure more than zero tests ran
     assert b"passed" in p.stdout
+
+
+def test_test_import_error(example_pkg):
+    """Are errors raised when importing the package reported?"""
+    init = "example_pkg/__init__.py"
+    with open(init) as f:
+        source = f.read()
+    try:
+        with open(init, "a") as f:
+            f.write("\nraise RuntimeError('broken build')\n")
+        p = spin("test", sys_exit=False)
+    finally:
+        with open(init, "w") as f:
+            f.write(source)
+
+    assert p.returncode != 0
+    output = (p.stdout + p.stderr).decode()
+    assert "RuntimeError: broken build" in output
+    assert "As a sanity check, we tried to import example_pkg" in output
+
+
+def test_test_changed(example_pkg):
+    """Are only the tests affected by changed files run?"""
+    p = spin("test", "--changed")
+    assert b"No tests are affected" in p.stdout
+
+    init = "example_pkg/__init__.py"
+    with open(init) as f:
+        source = f.read()
+    try:
+        with open(init, "a") as f:
+            f.write("\n# A change\n")
+        p = spin("test", "--changed", "--", "-v")
+    finally:
+        with open(init, "w") as f:
+            f.write(source)
+    assert b"test_core.py" in p.stdout
+    assert b"test_submodule.py" not in p.stdout
+
+    # Native sources affect the tests importing their extension module
+    source_fn = "example_pkg/coremodule.c"
+    with open(source_fn) as f:
+        source = f.read()
+    try:
+        with open(source_fn, "a") as f:
+            f.write("\n// A change\n")
+        p = spin("test", "--changed", "--", "-v")
+    finally:
+        with open(source_fn, "w") as f:
+            f.write(source)
+    assert b"test_core.py" in p.stdout
+    assert b"test_submodule.py" not in p.stdout
+
+    # Changes to configuration may affect any test
+    conftest = "example_pkg/conftest.py"
+    with open(conftest) as f:
+        source = f.read()
+    try:
+        with open(conftest, "a") as f:
+            f.write("\n# A change\n")
+        p = spin("test", "--changed", "--", "-v")
+    finally:
+        with open(conftest, "w") as f:
+            f.write(source)
+    assert b"Running all tests" in p.stdout
+    assert b"test_submodule.py" in p.stdout
+
+
+def test_test_changed_unknown_revision(example_pkg):
+    """Is an argument after `--changed` that is not a revision rejected?"""
+    p = spin("test", "--changed", "example_pkg/tests/test_core.py", sys_exit=False)
+    assert p.returncode != 0
+    assert b"is not a git revision" in p.stderr
+
+
+def test_test_durations(example_pkg):
+    """Are test durations recorded, also when running in parallel?"""
+    spin("test", "-j", "2")
+    p = spin("test", "--durations-report")
+    assert b"example_pkg/tests/test_core.py::test_core" in p.stdout
+
+
+def test_test_shard(example_pkg):
+    """Do shards partition the tests?"""
+    spin("test")
+    report = spin("test", "--durations-report").stdout
+    ran = []
+    for i in (1, 2, 3):
+        p = spin("test", "--shard", f"{i}/3", "--", "-v", "-rN")
+        ran.append(
+            [test for test in (b"test_core", b"test_something") if test in p.stdout]
+        )
+    assert sorted(test for shard in ran for test in shard) == [
+        b"test_core",
+        b"test_something",
+    ]
+
+    # Sharded runs leave the durations, and so the partition, as they were
+    assert spin("test", "--durations-report").stdout == report
@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+
+import pytest
+
+from spin.watch import Watcher, _GitIgnore, snapshot
+
+
+def test_gitignore(tmp_path):
+    (tmp_path / ".gitignore").write_text(
+        "# comment\n*.log\n!keep.log\nout/\n/top.txt\ndocs/**/gen\n"
+    )
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / ".gitignore").write_text("local.py\n")
+
+    gitignore = _GitIgnore(str(tmp_path))
+    gitignore.load(".")
+    gitignore.load("sub")
+
+    assert gitignore.ignored("a.log", False)
+    assert gitignore.ignored("sub/b.log", False)
+    assert not gitignore.ignored("keep.log", False)
+    assert gitignore.ignored("out", True)
+    assert not gitignore.ignored("out", False)
+    assert gitignore.ignored("top.txt", False)
+    assert not gitignore.ignored("sub/top.txt", False)
+    assert gitignore.ignored("docs/api/v1/gen", True)
+    assert gitignore.ignored("sub/local.py", False)
+    assert not gitignore.ignored("local.py", False)
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_watcher(tmp_path, use_inotify):
+    (tmp_path / ".gitignore").write_text("*.log\n")
+    for d in ("src", "build", ".git"):
+        (tmp_path / d).mkdir()
+    (tmp_path / "src" / "a.py").write_text("")
+
+    watcher = Watcher(
+        str(tmp_path),
+        ignore=[str(tmp_path / "build")],
+        debounce=0.2,
+        poll_interval=0.1,
+        use_inotify=use_inotify,
+    )
+
+    def edit():
+        time.sleep(0.3)
+        for path in ("build/x.o", ".git/index", "src/debug.log"):
+            (tmp_path / path).write_text("ignored")
+        # A burst of saves is reported once
+        for i in range(3):
+            (tmp_path / "src" / "a.py").write_text(str(i))
+            time.sleep(0.05)
+        os.mkdir(tmp_path / "src" / "new")
+        (tmp_path / "src" / "new" / "b.py").write_text("")
+
+    thread = threading.Thread(target=edit)
+    thread.start()
+    try:
+        changed = watcher.wait()
+    finally:
+        thread.join()
+        watcher.close()
+
+    assert "src/a.py" in changed
+    assert "src/new/b.py" in changed
+    assert not any(path.endswith((".o", ".log", "index")) for path in changed)
+
+
+def test_snapshot(tmp_path):
+    (tmp_path / ".gitignore").write_text("*.log\n")
+    for d in ("src", "build", ".git"):
+        (tmp_path / d).mkdir()
+    for path in ("src/a.py", "src/debug.log", "build/x.o", ".git/index"):
+        (tmp_path / path).write_text("x")
+
+    stamps = snapshot(str(tmp_path), ignore=[str(tmp_path / "build")])
+    assert sorted(stamps) == [".gitignore", "src/a.py"]
+    assert stamps["src/a.py"][1] == 1
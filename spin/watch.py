@@ -0,0 +1,392 @@
+"""Watch a source tree for changes.
+
+On Linux, changes are reported by inotify; elsewhere (or when inotify
+watches run out), the tree is polled.  Hidden directories, `__pycache__`,
+explicitly ignored directories, and paths matched by `.gitignore` files
+are not watched.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import re
+import select
+import struct
+import sys
+import time
+
+# From <sys/inotify.h>
+_IN_MODIFY = 0x2
+_IN_ATTRIB = 0x4
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_DELETE_SELF = 0x400
+_IN_Q_OVERFLOW = 0x4000
+_IN_IGNORED = 0x8000
+_IN_ONLYDIR = 0x1000000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+    | _IN_ONLYDIR
+)
+
+_EVENT = struct.Struct("iIII")
+
+
+def _translate_pattern(pattern: str) -> str:
+    """Translate a `.gitignore` glob into a regular expression."""
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+            continue
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+            continue
+
+        c = pattern[i]
+        if c == "*":
+            regex += "[^/]*"
+        elif c == "?":
+            regex += "[^/]"
+        elif c == "[" and (end := pattern.find("]", i + 2)) != -1:
+            chars = pattern[i + 1 : end].replace("\\", "\\\\")
+            if chars.startswith("!"):
+                chars = "^" + chars[1:]
+            regex += f"[{chars}]"
+            i = end
+        elif c == "\\" and i + 1 < len(pattern):
+            i += 1
+            regex += re.escape(pattern[i])
+        else:
+            regex += re.escape(c)
+        i += 1
+
+    if not anchored:
+        regex = "(?:.*/)?" + regex
+    return f"^{regex}$"
+
+
+class _GitIgnore:
+    """Rules from the `.gitignore` files of a tree, matched in order."""
+
+    def __init__(self, root: str = "."):
+        self.root = root
+        # (directory, compiled pattern, negated, directories only)
+        self.rules: list[tuple[str, re.Pattern, bool, bool]] = []
+
+    def load(self, directory: str):
+        """Add the rules of `directory/.gitignore`, if present.
+
+        `directory` is relative to the root of the tree, using `/`.
+        """
+        try:
+            with open(os.path.join(self.root, directory, ".gitignore")) as f:
+                lines = f.read().splitlines()
+        except (OSError, UnicodeDecodeError):
+            return
+
+        for line in lines:
+            line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            line = line.removeprefix("!")
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            try:
+                pattern = re.compile(_translate_pattern(line))
+            except re.error:
+                continue
+            self.rules.append((directory, pattern, negated, dir_only))
+
+    def ignored(self, path: str, is_dir: bool) -> bool:
+        """Whether `path` (relative to the root, using `/`) is ignored."""
+        ignored = False
+        for directory, pattern, negated, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if directory == ".":
+                rel = path
+            elif path.startswith(directory + "/"):
+                rel = path[len(directory) + 1 :]
+            else:
+                continue
+            if pattern.match(rel):
+                ignored = not negated
+        return ignored
+
+
+def snapshot(root: str = ".", ignore=(), ignore_dir=None) -> dict[str, tuple[int, int]]:
+    """Modification times (in nanoseconds) and sizes of the files that a
+    `Watcher` of `root` would watch, keyed on their paths relative to
+    `root`.  `ignore` and `ignore_dir` are as for `Watcher`.
+    """
+    return Watcher(
+        root, ignore=ignore, ignore_dir=ignore_dir, use_inotify=False
+    )._snapshot
+
+
+class Watcher:
+    """Report changes to files in a source tree.
+
+    Parameters
+    ----------
+    root : str
+        Top of the tree to watch.
+    ignore : list of str
+        Directories not to watch, such as build and install directories.
+    ignore_dir : callable
+        Called with the path of each directory; directories for which it
+        returns True are not watched.
+    debounce : float
+        Changes are reported once no further changes happened for this
+        many seconds, so that a burst of saves results in one report.
+    poll_interval : float
+        Seconds between scans of the tree, when polling.
+    use_inotify : bool
+        Whether to use inotify, where available, rather than polling.
+    """
+
+    def __init__(
+        self,
+        root: str = ".",
+        ignore=(),
+        ignore_dir=None,
+        debounce: float = 0.3,
+        poll_interval: float = 1.0,
+        use_inotify: bool = True,
+    ):
+        self.root = root
+        self.ignore = {os.path.abspath(d) for d in ignore}
+        self.ignore_dir = ignore_dir
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+
+        self._inotify_fd: int | None = None
+        self._watches: dict[int, str] = {}
+        self._snapshot: dict[str, tuple[int, int]] = {}
+        self._gitignore = _GitIgnore(root)
+
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._start_inotify()
+            except OSError:
+                self._stop_inotify()
+        if self._inotify_fd is None:
+            self._snapshot = self._scan()
+
+    @property
+    def method(self) -> str:
+        return "inotify" if self._inotify_fd is not None else "polling"
+
+    def close(self):
+        self._stop_inotify()
+
+    def wait(self) -> list[str]:
+        """Block until files change; return the changed paths."""
+        changed = self._changes(timeout=None)
+        while more := self._changes(timeout=self.debounce):
+            changed |= more
+        return sorted(changed)
+
+    def _walk(self, start: str = "."):
+        """Yield directories and files that are not ignored, as
+        `(path, is_dir)`, with paths relative to the root.
+
+        Walking from the root reloads the `.gitignore` rules.
+        """
+        if start == ".":
+            self._gitignore = _GitIgnore(self.root)
+        stack = [start]
+        while stack:
+            directory = stack.pop()
+            self._gitignore.load(directory)
+            yield directory, True
+            try:
+                entries = list(os.scandir(os.path.join(self.root, directory)))
+            except OSError:
+                continue
+            for entry in entries:
+                rel = entry.name if directory == "." else f"{directory}/{entry.name}"
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if self._ignored(rel, is_dir):
+                    continue
+                if is_dir:
+                    stack.append(rel)
+                else:
+                    yield rel, False
+
+    def _ignored(self, rel: str, is_dir: bool) -> bool:
+        name = rel.rsplit("/", 1)[-1]
+        if is_dir:
+            if name.startswith(".") or name == "__pycache__":
+                return True
+            path = os.path.join(self.root, rel)
+            if os.path.abspath(path) in self.ignore:
+                return True
+            if self.ignore_dir and self.ignore_dir(path):
+                return True
+        return self._gitignore.ignored(rel, is_dir)
+
+    def _changes(self, timeout: float | None) -> set[str]:
+        if self._inotify_fd is not None:
+            try:
+                return self._inotify_changes(timeout)
+            except OSError:
+                # E.g., out of watches for new directories
+                self._stop_inotify()
+                self._snapshot = self._scan()
+        return self._polling_changes(timeout)
+
+    # Polling
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        snapshot = {}
+        for rel, is_dir in self._walk():
+            if is_dir:
+                continue
+            try:
+                st = os.stat(os.path.join(self.root, rel))
+            except OSError:
+                continue
+            snapshot[rel] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def _polling_changes(self, timeout: float | None) -> set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            interval = self.poll_interval
+            if deadline is not None:
+                interval = min(interval, max(0.0, deadline - time.monotonic()))
+            time.sleep(interval)
+
+            snapshot = self._scan()
+            changed = {
+                path
+                for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            self._snapshot = snapshot
+            if changed or ((deadline is not None) and time.monotonic() >= deadline):
+                return changed
+
+    # inotify
+
+    def _start_inotify(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._libc = libc
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._inotify_fd = fd
+        for rel, is_dir in self._walk():
+            if is_dir:
+                self._add_watch(rel)
+
+    def _stop_inotify(self):
+        if self._inotify_fd is not None:
+            os.close(self._inotify_fd)
+        self._inotify_fd = None
+        self._watches = {}
+
+    def _add_watch(self, rel: str):
+        path = os.path.join(self.root, rel)
+        wd = self._libc.inotify_add_watch(
+            self._inotify_fd, os.fsencode(path), _WATCH_MASK
+        )
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                return
+            raise OSError(err, f"Cannot watch `{path}`: {os.strerror(err)}")
+        self._watches[wd] = rel
+
+    def _inotify_changes(self, timeout: float | None) -> set[str]:
+        assert self._inotify_fd is not None
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed: set[str] = set()
+        while not changed:
+            remaining = None
+            if deadline is not None:
+                remaining = max(0.0, deadline - time.monotonic())
+            ready, _, _ = select.select([self._inotify_fd], [], [], remaining)
+            if not ready:
+                break
+
+            try:
+                data = os.read(self._inotify_fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                raw_name = data[offset + _EVENT.size : offset + _EVENT.size + length]
+                offset += _EVENT.size + length
+
+                if mask & _IN_Q_OVERFLOW:
+                    # Events were lost; report the whole tree as changed
+                    changed.add(".")
+                    continue
+
+                directory = self._watches.get(wd)
+                if directory is None:
+                    continue
+                if mask & _IN_IGNORED:
+                    del self._watches[wd]
+                    continue
+
+                name = os.fsdecode(raw_name.rstrip(b"\0"))
+                if not name:
+                    continue
+                rel = name if directory == "." else f"{directory}/{name}"
+                is_dir = bool(mask & _IN_ISDIR)
+                if self._ignored(rel, is_dir):
+                    continue
+
+                if is_dir and (mask & (_IN_CREATE | _IN_MOVED_TO)):
+                    # Watch new directories, and what they already contain
+                    for sub, sub_is_dir in self._walk(rel):
+                        if sub_is_dir:
+                            self._add_watch(sub)
+                        else:
+                            changed.add(sub)
+                elif rel.rsplit("/", 1)[-1] == ".gitignore":
+                    self._reload_gitignore()
+                    changed.add(rel)
+                else:
+                    changed.add(rel)
+        return changed
+
+    def _reload_gitignore(self):
+        """Re-read ignore rules, and watch directories no longer ignored."""
+        watched = set(self._watches.values())
+        for rel, is_dir in self._walk():
+            if is_dir and rel not in watched:
+                self._add_watch(rel)